@@ -14,22 +14,102 @@ print_message () {
     echo -e "${left_filler_len// /$symbol}$message${right_filler_len// /$symbol}\033[0m"
 }
 
+# Параллельный режим: ./run_tests.sh --parallel
+# Проекты тестируются одновременно, тесты каждого раскладываются по
+# процессам pytest-xdist (число задаёт TEST_WORKERS, по умолчанию auto),
+# тестовые базы SQLite лежат в .test_db и переиспользуются, пока не
+# изменились миграции проекта.
+[[ "$1" == "--parallel" ]] && PARALLEL=1
 
+now_ms () {
+    echo $(( $(date +%s%N) / 1000000 ))
+}
+
+report_phase () {
+    # Печатает длительность этапа: первый аргумент — название этапа,
+    # второй — время начала в миллисекундах.
+    local elapsed=$(( $(now_ms) - $2 ))
+    printf "%-10s %d.%03d с\n" "$1" $(( elapsed / 1000 )) $(( elapsed % 1000 )) 1>&2
+}
+
+migrations_hash () {
+    # Хеш файлов миграций проекта (первый аргумент — каталог проекта).
+    find "$1" -path '*/migrations/*.py' -print0 | sort -z | xargs -0 cat | sha1sum | cut -c1-12
+}
+
+run_project () {
+    # Запускает pytest проекта с переиспользуемой базой, вывод пишет в файл.
+    # Аргументы: каталог проекта, модуль настроек, файл для вывода.
+    local started=$(now_ms)
+    local db_prefix="$PWD/.test_db/$1"
+    local hash=$(migrations_hash "$1")
+    mkdir -p .test_db
+    find .test_db -name "$1-*" ! -name "$1-$hash.*" -delete
+    (
+        cd "$1" &&
+        DJANGO_SETTINGS_MODULE="$2" \
+        DJANGO_TEST_SQLITE_PATH="$db_prefix-$hash.sqlite3" \
+        pytest --tb=line -n "${TEST_WORKERS:-auto}" --reuse-db
+    ) > "$3" 2>&1
+    local status=$?
+    report_phase "$1" "$started" 2>> "$3"
+    return $status
+}
+
+run_parallel () {
+    local logs=$(mktemp -d)
+    local started=$(now_ms)
+    run_project ya_news yanews.settings "$logs/ya_news" &
+    local news_pid=$!
+    run_project ya_note yanote.settings "$logs/ya_note" &
+    local note_pid=$!
+    wait $news_pid
+    local news_status=$?
+    wait $note_pid
+    local note_status=$?
+    cat "$logs/ya_news" "$logs/ya_note" 1>&2
+    rm -rf "$logs"
+    report_phase pytest "$started"
+    if [[ $news_status -ne 0 ]]; then
+        print_message " При запуске упали ваши тесты для проекта YaNews. Проверьте тесты этого проекта " "=" 1
+        echo \`\`\` 1>&2
+        return $news_status
+    fi
+    if [[ $note_status -ne 0 ]]; then
+        print_message " При запуске упали ваши тесты для проекта YaNote. Проверьте тесты этого проекта " "=" 1
+        echo \`\`\` 1>&2
+        return $note_status
+    fi
+}
+
+
+started=$(now_ms)
 if python -m flake8 --config=setup.cfg 1>&2;
 then
+    report_phase flake8 "$started"
     print_message " flake8 завершил проверку кода, ошибок не обнаружено " "="
     echo $LF 1>&2
+    started=$(now_ms)
     if python structure_test.py
     then
+        report_phase structure "$started"
+        if [[ -n "$PARALLEL" ]]; then
+            run_parallel
+            exit $?
+        fi
+        started=$(now_ms)
         cd ya_news
         export DJANGO_SETTINGS_MODULE="${DJANGO_SETTINGS_MODULE:="yanews.settings"}"
         if pytest --tb=line 1>&2;
         then
+            report_phase ya_news "$started"
+            started=$(now_ms)
             cd ../ya_note
             unset DJANGO_SETTINGS_MODULE
             export DJANGO_SETTINGS_MODULE="${DJANGO_SETTINGS_MODULE:="yanote.settings"}"
             if pytest --tb=line 1>&2;
             then
+                report_phase ya_note "$started"
                 exit 0
             else
                 status=$?
@@ -0,0 +1,152 @@
+"""
+Нагрузочное сравнение синхронного (WSGI) и асинхронного (ASGI) чтения.
+
+Каждый режим запускается в отдельном процессе со своей базой SQLite во
+временном каталоге: под WSGI запросы к главной и странице новости идут
+из пула потоков через Client, под ASGI — конкурентными корутинами через
+AsyncClient и асинхронные представления (NEWS_ASYNC_VIEWS=1).
+
+Запуск из каталога ya_news: python -m benchmarks.asgi
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+MODES = ('wsgi', 'asgi')
+
+
+def prepare(comments):
+    """Создаёт базу с новостями и комментариями, возвращает адреса."""
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    from django.urls import reverse
+
+    from news.models import Comment, News
+
+    setup_test_environment()
+    call_command('migrate', verbosity=0)
+    author = get_user_model().objects.create(username='Автор')
+    news = News.objects.bulk_create(
+        News(title=f'Новость {index}', text='Текст новости')
+        for index in range(20)
+    )
+    Comment.objects.bulk_create(
+        Comment(news=news[0], author=author, text=f'Комментарий {index}')
+        for index in range(comments)
+    )
+    News.objects.update_comment_count()
+    connection.close()
+    return [reverse('news:home'), reverse('news:detail', args=(news[0].pk,))]
+
+
+def summarize(latencies, elapsed, errors):
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'seconds': elapsed,
+        'rps': len(latencies) / elapsed,
+        'p50': latencies[len(latencies) // 2],
+        'p99': latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)],
+    }
+
+
+def run_wsgi(urls, concurrency, requests):
+    from django.test import Client
+
+    def fetch(index):
+        client = Client(raise_request_exception=False)
+        started = time.perf_counter()
+        status = client.get(urls[index % len(urls)]).status_code
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(fetch, range(requests)))
+    elapsed = time.perf_counter() - started
+    return summarize(
+        [latency for latency, _ in results],
+        elapsed,
+        sum(status >= 400 for _, status in results),
+    )
+
+
+def run_asgi(urls, concurrency, requests):
+    from django.test import AsyncClient
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(index):
+            async with semaphore:
+                client = AsyncClient(raise_request_exception=False)
+                started = time.perf_counter()
+                response = await client.get(urls[index % len(urls)])
+                return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*map(fetch, range(requests)))
+        return results, time.perf_counter() - started
+
+    results, elapsed = asyncio.run(main())
+    return summarize(
+        [latency for latency, _ in results],
+        elapsed,
+        sum(status >= 400 for _, status in results),
+    )
+
+
+def worker(mode, concurrency, requests, comments):
+    import django
+
+    django.setup()
+    urls = prepare(comments)
+    run = run_asgi if mode == 'asgi' else run_wsgi
+    print(json.dumps(run(urls, concurrency, requests)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--comments', type=int, default=50)
+    parser.add_argument('--worker', choices=MODES)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(
+            args.worker, args.concurrency, args.requests, args.comments
+        )
+    for mode in MODES:
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(
+                os.environ,
+                DJANGO_SETTINGS_MODULE='yanews.settings',
+                DJANGO_SQLITE_PATH=str(Path(directory) / 'db.sqlite3'),
+                NEWS_ASYNC_VIEWS='1' if mode == 'asgi' else '0',
+            )
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.asgi',
+                 '--worker', mode,
+                 '--concurrency', str(args.concurrency),
+                 '--requests', str(args.requests),
+                 '--comments', str(args.comments)],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f'{mode:5} {result["rps"]:8.1f} запросов/с, '
+              f'p50: {result["p50"] * 1000:.1f} мс, '
+              f'p99: {result["p99"] * 1000:.1f} мс, '
+              f'ошибок: {result["errors"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Стоимость одного комментария в ленте под новостью.
+
+Сравнивает прежнюю выборку экземпляров Comment с select_related('author')
+и выборку кортежей CommentRow через values_list(). Для каждого варианта
+замеряются время выборки и отрисовки шаблона комментариев и пиковая
+память на выборке в пересчёте на один комментарий.
+
+Запуск из каталога ya_news: python -m benchmarks.comments
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Разметка комментария до перехода на CommentRow: имя и сравнение автора
+# идут через экземпляр User.
+INSTANCE_TEMPLATE = """{% for comment in comments %}
+  <div>
+    <b>{{ comment.author }}</b>, {{ comment.created }}</b>
+    <p class="mb-0">{{ comment.text|linebreaksbr }}</p>
+    {% if comment.author == user %}
+      <a href="{% url 'news:edit' comment.pk %}">Редактировать</a> |
+      <a href="{% url 'news:delete' comment.pk %}">Удалить</a>
+    {% endif %}
+  </div>
+  <br>
+{% endfor %}"""
+
+
+def prepare(comments, users_count):
+    """Создаёт новость с обсуждением и возвращает её."""
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.test.utils import setup_test_environment
+
+    from news.models import Comment, News
+
+    setup_test_environment()
+    call_command('migrate', verbosity=0)
+    users = get_user_model().objects.bulk_create(
+        get_user_model()(username=f'reader-{index}')
+        for index in range(users_count)
+    )
+    news = News.objects.create(title='Новость', text='Текст новости')
+    Comment.objects.bulk_create(
+        (
+            Comment(
+                news=news,
+                author=users[index % users_count],
+                text=f'Комментарий {index} о погоде и новостях дня.',
+            )
+            for index in range(comments)
+        ),
+        batch_size=1000,
+    )
+    return news, users[0]
+
+
+def variants(news_id, per_page):
+    """
+    Варианты: название, функция, возвращающая страницу, и шаблон.
+
+    Страница вмещает всё обсуждение, чтобы стоимость делилась на все
+    комментарии.
+    """
+    from django.conf import settings
+    from django.template import engines
+    from django.template.loader import get_template
+
+    from news.models import Comment
+    from news.pagination import KeysetPaginator
+    from news.views import get_comments_paginator
+
+    settings.COMMENTS_COUNT_ON_PAGE = per_page
+    instances = KeysetPaginator(
+        Comment.objects.filter(news_id=news_id).select_related('author'),
+        ('created', 'pk'),
+        per_page,
+    )
+    rows = get_comments_paginator(news_id)
+    return [
+        ('Comment', lambda: instances.get_page().object_list,
+         engines['django'].from_string(INSTANCE_TEMPLATE)),
+        ('CommentRow', lambda: rows.get_page().object_list,
+         get_template('news/includes/comments.html')),
+    ]
+
+
+def measure(fetch, template, user, news_id, repeat):
+    """Возвращает время выборки, отрисовки и пиковую память в байтах."""
+    fetch_seconds = render_seconds = 0.0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        comments = fetch()
+        fetched = time.perf_counter()
+        template.render({'comments': comments, 'user': user,
+                         'news_id': news_id})
+        fetch_seconds += fetched - started
+        render_seconds += time.perf_counter() - fetched
+    tracemalloc.start()
+    fetch()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return fetch_seconds / repeat, render_seconds / repeat, peak
+
+
+def run(args):
+    import django
+
+    django.setup()
+    news, user = prepare(args.comments, args.users)
+    for name, fetch, template in variants(news.pk, args.comments):
+        fetch_seconds, render_seconds, peak = measure(
+            fetch, template, user, news.pk, args.repeat
+        )
+        print(f'{name:10} выборка {fetch_seconds / args.comments * 1e6:6.2f}'
+              f' мкс, отрисовка {render_seconds / args.comments * 1e6:6.2f}'
+              f' мкс, память {peak / args.comments:7.0f} Б '
+              f'на комментарий')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--comments', type=int, default=5000)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ.update(
+            DJANGO_SETTINGS_MODULE='yanews.settings',
+            DJANGO_SQLITE_PATH=str(Path(directory) / 'db.sqlite3'),
+        )
+        run(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Нагрузочное сравнение профилей базы данных.
+
+Для каждого профиля запускается отдельный процесс со своей базой SQLite
+во временном каталоге. Потоки параллельно читают новости и пишут
+комментарии через тестовый клиент Django.
+
+Запуск из каталога ya_news: python -m benchmarks.db_profiles
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+PROFILES = ('development', 'production')
+
+
+def worker(threads, requests_per_thread, write_share):
+    import django
+
+    django.setup()
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+    from django.urls import reverse
+
+    from news.models import News
+
+    setup_test_environment()
+    call_command('migrate', verbosity=0)
+    news = News.objects.create(title='Новость', text='Текст новости')
+    users = [
+        get_user_model().objects.create(username=f'reader-{index}')
+        for index in range(threads)
+    ]
+    connection.close()
+    detail_url = reverse('news:detail', args=(news.pk,))
+    results = {'ok': 0, 'errors': 0}
+    lock = threading.Lock()
+    write_every = max(1, round(1 / write_share)) if write_share else 0
+
+    def run(user):
+        client = Client(raise_request_exception=False)
+        client.force_login(user)
+        ok = errors = 0
+        for index in range(requests_per_thread):
+            if write_every and index % write_every == 0:
+                response = client.post(detail_url, {'text': f'Текст {index}'})
+            else:
+                response = client.get(detail_url)
+            if response.status_code < 400:
+                ok += 1
+            else:
+                errors += 1
+        with lock:
+            results['ok'] += ok
+            results['errors'] += errors
+
+    pool = [threading.Thread(target=run, args=(user,)) for user in users]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    results['seconds'] = elapsed
+    results['rps'] = results['ok'] / elapsed
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--write-share', type=float, default=0.2)
+    parser.add_argument('--worker', action='store_true')
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args.threads, args.requests, args.write_share)
+    for profile in PROFILES:
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(
+                os.environ,
+                DJANGO_SETTINGS_MODULE='yanews.settings',
+                DJANGO_DB_PROFILE=profile,
+                DJANGO_SQLITE_PATH=str(Path(directory) / 'db.sqlite3'),
+                NEWS_RATELIMIT_ENABLED='0',
+            )
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.db_profiles', '--worker',
+                 '--threads', str(args.threads),
+                 '--requests', str(args.requests),
+                 '--write-share', str(args.write_share)],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f'{profile:12} {result["rps"]:8.1f} запросов/с, '
+              f'ошибок: {result["errors"]}, '
+              f'время: {result["seconds"]:.2f} с')
+
+
+if __name__ == '__main__':
+    main()
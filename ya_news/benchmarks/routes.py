@@ -0,0 +1,263 @@
+"""
+Нагрузочный прогон всех маршрутов news и users на наполненной базе.
+
+База SQLite создаётся во временном каталоге и наполняется новостями,
+комментариями и пользователями. Затем каждый маршрут запрашивается через
+тестовый клиент Django; для него замеряются пропускная способность,
+задержки p50/p95/p99 и число запросов к базе на ответ. Результаты
+пишутся в JSON вместе с коммитом, чтобы сравнивать прогоны между собой.
+
+Запуск из каталога ya_news: python -m benchmarks.routes
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+PASSWORD = 'benchmark-password'
+
+
+def seed(news_count, comments_per_news, users_count):
+    """Наполняет базу и возвращает пользователей-авторов комментариев."""
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import Permission
+    from django.utils import timezone as django_timezone
+
+    from news import search
+    from news.models import Comment, News
+
+    password = make_password(PASSWORD)
+    users = get_user_model().objects.bulk_create(
+        get_user_model()(username=f'reader-{index}', password=password)
+        for index in range(users_count)
+    )
+    moderator = get_user_model().objects.create(username='moderator')
+    moderator.user_permissions.add(
+        Permission.objects.get(codename='delete_comment')
+    )
+    today = django_timezone.now()
+    news = News.objects.bulk_create(
+        News(
+            title=f'Новость номер {index}',
+            text=f'Текст новости {index} о погоде, спорте и культуре.',
+            date=today - timedelta(hours=index),
+        )
+        for index in range(news_count)
+    )
+    Comment.objects.bulk_create(
+        (
+            Comment(
+                news=item,
+                author=users[(item.pk + index) % users_count],
+                text=f'Комментарий {index} к новости {item.pk}',
+                created=today + timedelta(seconds=index),
+            )
+            for item in news
+            for index in range(comments_per_news)
+        ),
+        batch_size=1000,
+    )
+    News.objects.update_comment_count()
+    search.rebuild()
+    return users, moderator
+
+
+def routes(users, clients):
+    """
+    Сценарии: имя маршрута, клиент, метод и функция, возвращающая адрес и
+    данные для очередного запроса.
+    """
+    from django.urls import reverse
+
+    from news.models import Comment, News
+
+    author = users[0]
+    news_id = News.objects.order_by('-date').values_list('pk', flat=True)[0]
+    detail = reverse('news:detail', args=(news_id,))
+    own = Comment.objects.filter(author=author).order_by('pk')
+    edit_ids = list(own.values_list('pk', flat=True)[:1])
+    delete_ids = iter(own.values_list('pk', flat=True)[1:])
+    moderated_ids = iter(
+        Comment.objects.exclude(author=author).order_by('-pk')
+        .values_list('pk', flat=True)
+    )
+
+    def fixed(url, data=None):
+        return lambda: (url, data)
+
+    def logout():
+        clients['author'].force_login(author)
+        return reverse('users:logout'), None
+
+    return [
+        ('news:home', 'anonymous', 'get', fixed(reverse('news:home'))),
+        ('news:home', 'author', 'get', fixed(reverse('news:home'))),
+        ('news:archive', 'anonymous', 'get', fixed(reverse('news:archive'))),
+        ('news:search', 'anonymous', 'get',
+         fixed(reverse('news:search'), {'q': 'погода'})),
+        ('news:detail', 'anonymous', 'get', fixed(detail)),
+        ('news:detail', 'author', 'get', fixed(detail)),
+        ('news:comments', 'anonymous', 'get',
+         fixed(reverse('news:comments', args=(news_id,)))),
+        ('news:detail', 'author', 'post',
+         fixed(detail, {'text': 'Новый комментарий'})),
+        ('news:edit', 'author', 'get',
+         fixed(reverse('news:edit', args=edit_ids))),
+        ('news:edit', 'author', 'post',
+         fixed(reverse('news:edit', args=edit_ids), {'text': 'Правка'})),
+        ('news:delete', 'author', 'get',
+         fixed(reverse('news:delete', args=edit_ids))),
+        ('news:delete', 'author', 'post',
+         lambda: (reverse('news:delete', args=(next(delete_ids),)), None)),
+        ('news:bulk_delete', 'moderator', 'post',
+         lambda: (reverse('news:bulk_delete'),
+                  {'ids': [next(moderated_ids)]})),
+        ('users:login', 'anonymous', 'get', fixed(reverse('users:login'))),
+        ('users:login', 'guest', 'post',
+         fixed(reverse('users:login'),
+               {'username': author.username, 'password': PASSWORD})),
+        ('users:signup', 'anonymous', 'get', fixed(reverse('users:signup'))),
+        ('users:logout', 'author', 'post', logout),
+    ]
+
+
+def percentile(values, share):
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def measure(client, method, next_request, requests):
+    """
+    Прогоняет сценарий и возвращает сводку замеров.
+
+    Подготовка очередного запроса в замеры не входит.
+    """
+    from django.db import connection
+
+    from news.instrumentation import QueryRecorder
+
+    latencies = []
+    errors = 0
+    query = None
+    recorder = QueryRecorder()
+    elapsed = 0.0
+    for _ in range(requests):
+        try:
+            url, data = next_request()
+        except StopIteration:
+            break
+        if method == 'get' and not latencies:
+            query = data
+        started = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = getattr(client, method)(url, data)
+        latencies.append(time.perf_counter() - started)
+        elapsed += latencies[-1]
+        errors += response.status_code >= 400
+    latencies.sort()
+    return {
+        'query': query,
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'queries_per_request': round(recorder.count / len(latencies), 2),
+    }
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            check=True, capture_output=True, text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(args):
+    import django
+
+    django.setup()
+    from django.core.management import call_command
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    call_command('migrate', verbosity=0)
+    users, moderator = seed(args.news, args.comments, args.users)
+    clients = {'anonymous': Client(), 'guest': Client()}
+    for name, user in (('author', users[0]), ('moderator', moderator)):
+        clients[name] = Client()
+        clients[name].force_login(user)
+    results = []
+    for name, client_name, method, next_request in routes(users, clients):
+        result = measure(
+            clients[client_name], method, next_request, args.requests
+        )
+        results.append(
+            {'route': name, 'client': client_name, 'method': method,
+             **result}
+        )
+        query = '&'.join(f'{key}={value}' for key, value in (
+            result['query'] or {}
+        ).items())
+        print(f'{name:18} {client_name:9} {method:4} {query:14} '
+              f'{result["rps"]:8.1f} запросов/с  '
+              f'p50 {result["p50_ms"]:7.2f}  p95 {result["p95_ms"]:7.2f}  '
+              f'p99 {result["p99_ms"]:7.2f} мс  '
+              f'запросов к базе: {result["queries_per_request"]:5.1f}  '
+              f'ошибок: {result["errors"]}')
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--news', type=int, default=500)
+    parser.add_argument('--comments', type=int, default=20,
+                        help='Комментариев к каждой новости.')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=200,
+                        help='Запросов на каждый маршрут.')
+    parser.add_argument('--output', type=Path,
+                        help='Файл JSON; по умолчанию '
+                             '.benchmarks/routes-<коммит>.json.')
+    args = parser.parse_args()
+    revision = commit()
+    output = args.output or Path('.benchmarks') / f'routes-{revision}.json'
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ.update(
+            DJANGO_SETTINGS_MODULE='yanews.settings',
+            DJANGO_SQLITE_PATH=str(Path(directory) / 'db.sqlite3'),
+            NEWS_RATELIMIT_ENABLED='0',
+            NEWS_INSTRUMENTATION_SAMPLE_RATE='0',
+        )
+        results = run(args)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        'project': 'ya_news',
+        'commit': revision,
+        'created': datetime.now(timezone.utc).isoformat(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'params': {
+            'news': args.news,
+            'comments_per_news': args.comments,
+            'users': args.users,
+            'requests_per_route': args.requests,
+        },
+        'routes': results,
+    }, ensure_ascii=False, indent=2))
+    print(f'Результаты: {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Comment, News
+from .models import BadWord, Comment, News
+from .moderation import delete_comments
 
 
 class CommentInline(admin.StackedInline):
@@ -13,3 +14,46 @@ class NewsAdmin(admin.ModelAdmin):
     inlines = [
         CommentInline,
     ]
+
+    def save_related(self, request, form, formsets, change):
+        """После правки комментариев в инлайне пересчитываем их количество."""
+        super().save_related(request, form, formsets, change)
+        News.objects.filter(pk=form.instance.pk).update_comment_count()
+
+
+@admin.register(Comment)
+class CommentAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'author', 'news', 'created')
+    list_filter = ('created',)
+    search_fields = ('author__username', 'text')
+    raw_id_fields = ('news', 'author')
+    actions = ('delete_selected_comments',)
+
+    def get_actions(self, request):
+        """Стандартное удаление не пересчитывает счётчики новостей."""
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def save_model(self, request, obj, form, change):
+        """Пересчитываем счётчики новости до и после правки комментария."""
+        super().save_model(request, obj, form, change)
+        News.objects.filter(
+            pk__in={form.initial.get('news'), obj.news_id} - {None}
+        ).update_comment_count()
+
+    def delete_model(self, request, obj):
+        delete_comments(Comment.objects.filter(pk=obj.pk))
+
+    @admin.action(
+        description='Удалить выбранные комментарии',
+        permissions=('delete',),
+    )
+    def delete_selected_comments(self, request, queryset):
+        deleted = delete_comments(queryset)
+        self.message_user(request, f'Удалено комментариев: {deleted}.')
+
+
+@admin.register(BadWord)
+class BadWordAdmin(admin.ModelAdmin):
+    search_fields = ('word',)
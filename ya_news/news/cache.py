@@ -0,0 +1,154 @@
+"""
+Кеширование главной страницы новостей.
+
+Страницы сбрасываются сменой версии в кеше NEWS_CACHE_ALIAS. Сброс виден
+всем процессам только с общим бэкендом (FileBasedCache, RedisCache): в
+locmem у каждого процесса своя версия, и остальные процессы отдают
+прежнюю главную до истечения NEWS_HOME_CACHE_TIMEOUT, а прежние ETag —
+до истечения NEWS_CACHE_VALIDATOR_TIMEOUT.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import caches
+
+VERSION_KEY = 'news:version'
+MODIFIED_KEY = 'news:modified'
+HOME_PAGE_KEY = 'news:home:{version}'
+STATS_KEY = 'news:home:stats:{event}'
+HIT = 'hits'
+MISS = 'misses'
+
+
+def get_cache():
+    return caches[settings.NEWS_CACHE_ALIAS]
+
+
+def get_version():
+    """
+    Возвращает текущую версию данных новостей.
+
+    Если ключ вытеснен из кеша или истёк, заводим новую версию от текущего
+    времени, чтобы не воскресить старые страницы с тем же номером.
+    """
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(
+            VERSION_KEY, time.time_ns(),
+            timeout=settings.NEWS_CACHE_VALIDATOR_TIMEOUT,
+        )
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+async def aget_version():
+    """Асинхронный вариант get_version()."""
+    cache = get_cache()
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(
+            VERSION_KEY, time.time_ns(),
+            timeout=settings.NEWS_CACHE_VALIDATOR_TIMEOUT,
+        )
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    """
+    Делает устаревшими все закешированные страницы новостей.
+
+    С locmem — только в текущем процессе.
+    """
+    cache = get_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(
+            VERSION_KEY, time.time_ns(),
+            timeout=settings.NEWS_CACHE_VALIDATOR_TIMEOUT,
+        )
+    cache.set(
+        MODIFIED_KEY, time.time(),
+        timeout=settings.NEWS_CACHE_VALIDATOR_TIMEOUT,
+    )
+
+
+def get_last_modified():
+    """
+    Время последнего изменения новостей или комментариев.
+
+    Если ключ вытеснен или истёк, считаем, что данные изменились только
+    что: лишний полный ответ лучше ошибочного 304.
+    """
+    cache = get_cache()
+    value = cache.get(MODIFIED_KEY)
+    if value is None:
+        cache.add(
+            MODIFIED_KEY, time.time(),
+            timeout=settings.NEWS_CACHE_VALIDATOR_TIMEOUT,
+        )
+        value = cache.get(MODIFIED_KEY)
+    return datetime.fromtimestamp(value, tz=timezone.utc)
+
+
+def page_etag(request, *args, **kwargs):
+    """
+    Метка ETag страниц новостей для условного GET.
+
+    Складывается из версии данных и cookie сессии: шапка и ссылки на
+    правку комментариев у каждого пользователя свои. Базу не трогает,
+    поэтому 304 отдаётся без загрузки новости и комментариев.
+
+    С locmem процесс, не видевший сброса версии, отдаёт прежнюю метку до
+    истечения NEWS_CACHE_VALIDATOR_TIMEOUT.
+    """
+    session = request.COOKIES.get(settings.SESSION_COOKIE_NAME, '')
+    raw = f'{get_version()}:{request.path}:{session}'
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+def page_last_modified(request, *args, **kwargs):
+    return get_last_modified()
+
+
+def home_page_key(version=None):
+    """
+    Ключ главной страницы для версии данных, по умолчанию текущей.
+
+    Асинхронные представления передают версию из aget_version(), чтобы
+    не читать кеш синхронно.
+    """
+    if version is None:
+        version = get_version()
+    return HOME_PAGE_KEY.format(version=version)
+
+
+def record(event):
+    """Учитывает попадание или промах кеша главной страницы."""
+    cache = get_cache()
+    key = STATS_KEY.format(event=event)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+async def arecord(event):
+    """Асинхронный вариант record()."""
+    cache = get_cache()
+    key = STATS_KEY.format(event=event)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 1, timeout=None)
+
+
+def get_stats():
+    """Возвращает счётчики попаданий и промахов кеша главной страницы."""
+    keys = {STATS_KEY.format(event=event): event for event in (HIT, MISS)}
+    values = get_cache().get_many(keys)
+    return {event: values.get(key, 0) for key, event in keys.items()}
@@ -1,7 +1,10 @@
-from django.forms import ModelForm
+from django import forms
+from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from django.forms import ModelForm
 
 from .models import Comment
+from .profanity import get_matcher
 
 BAD_WORDS = (
     'редиска',
@@ -20,8 +23,48 @@ class CommentForm(ModelForm):
     def clean_text(self):
         """Не позволяем ругаться в комментариях."""
         text = self.cleaned_data['text']
-        lowered_text = text.lower()
-        for word in BAD_WORDS:
-            if word in lowered_text:
-                raise ValidationError(WARNING)
+        self.bad_words = get_matcher(BAD_WORDS).find_all(text)
+        if self.bad_words:
+            raise ValidationError(WARNING)
         return text
+
+
+class CommentModerationForm(forms.Form):
+    """Отбор комментариев для массового удаления."""
+
+    ids = forms.Field(
+        required=False, widget=forms.SelectMultiple, label='Комментарии'
+    )
+    author = forms.ModelChoiceField(
+        queryset=get_user_model().objects.all(),
+        required=False,
+        label='Автор',
+    )
+    created_from = forms.DateTimeField(required=False, label='Создан после')
+    created_to = forms.DateTimeField(required=False, label='Создан до')
+
+    def clean_ids(self):
+        try:
+            return [int(pk) for pk in self.cleaned_data['ids'] or ()]
+        except ValueError:
+            raise ValidationError('Идентификаторы должны быть числами.')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not any(cleaned_data.get(field) for field in self.fields):
+            raise ValidationError('Укажите хотя бы одно условие отбора.')
+        return cleaned_data
+
+    def get_queryset(self):
+        """Комментарии, подходящие под все указанные условия."""
+        queryset = Comment.objects.all()
+        data = self.cleaned_data
+        if data['ids']:
+            queryset = queryset.filter(pk__in=data['ids'])
+        if data['author']:
+            queryset = queryset.filter(author=data['author'])
+        if data['created_from']:
+            queryset = queryset.filter(created__gte=data['created_from'])
+        if data['created_to']:
+            queryset = queryset.filter(created__lte=data['created_to'])
+        return queryset
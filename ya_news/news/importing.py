@@ -0,0 +1,151 @@
+"""Потоковый импорт новостей из JSON и NDJSON."""
+import json
+import time
+from datetime import date
+from itertools import chain
+
+from django.db import transaction
+
+from . import cache, search
+from .models import News
+
+READ_SIZE = 64 * 1024
+SEPARATORS = ' \t\r\n,'
+
+
+def iter_json_array(file, head='', read_size=READ_SIZE):
+    """
+    Отдаёт элементы JSON-массива объектов по одному.
+
+    В памяти держится только недочитанный хвост, а не весь файл. head —
+    уже прочитанное из файла начало.
+    """
+    decoder = json.JSONDecoder()
+    buffer = head + file.read(read_size)
+    eof = buffer == head
+    buffer = buffer.lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('Ожидался JSON-массив.')
+    position = 1
+    number = 0
+    while True:
+        while position < len(buffer) and buffer[position] in SEPARATORS:
+            position += 1
+        if position < len(buffer):
+            if buffer[position] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                number += 1
+                yield check_object(item, f'Элемент {number} массива')
+                continue
+        if eof:
+            raise ValueError('JSON-массив оборвался.')
+        buffer = buffer[position:]
+        position = 0
+        chunk = file.read(read_size)
+        eof = not chunk
+        buffer += chunk
+
+
+def iter_ndjson(file, head=''):
+    """Отдаёт объекты NDJSON-файла, по одному на строку."""
+    lines = chain([head + file.readline()], file)
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as error:
+            raise ValueError(f'Строка {number}: {error}')
+        yield check_object(record, f'Строка {number}')
+
+
+def check_object(record, where):
+    """Запись должна быть JSON-объектом, а не списком или строкой."""
+    if not isinstance(record, dict):
+        raise ValueError(
+            f'{where}: ожидался JSON-объект, получен '
+            f'{type(record).__name__}.'
+        )
+    return record
+
+
+def iter_records(file):
+    """Определяет формат по первому символу: «[» — массив, иначе NDJSON."""
+    head = file.read(1)
+    while head and head in SEPARATORS:
+        head = file.read(1)
+    if not head:
+        return iter(())
+    if head == '[':
+        return iter_json_array(file, head)
+    return iter_ndjson(file, head)
+
+
+def to_news(record):
+    """Принимает и запись фикстуры Django, и плоский объект новости."""
+    fields = check_object(record.get('fields', record), 'Поле fields')
+    news = News(title=fields['title'], text=fields.get('text', ''))
+    # Умолчание модели — datetime.today, а в базе и в ключе дублей дата:
+    # без явной даты повторный импорт не узнал бы уже загруженное.
+    news.date = date.today()
+    if fields.get('date'):
+        news.date = News._meta.get_field('date').to_python(fields['date'])
+    return news
+
+
+def import_news(records, batch_size=1000):
+    """
+    Сохраняет новости пачками через bulk_create, пропуская дубли.
+
+    Дублем считается новость с теми же заголовком и датой — уже
+    сохранённая или встреченная раньше в этом же импорте. Возвращает
+    словарь со счётчиками и скоростью импорта.
+    """
+    started = time.monotonic()
+    created = skipped = 0
+    batch = []
+    for record in records:
+        batch.append(to_news(record))
+        if len(batch) == batch_size:
+            saved = _save_batch(batch)
+            created += saved
+            skipped += len(batch) - saved
+            batch = []
+    if batch:
+        saved = _save_batch(batch)
+        created += saved
+        skipped += len(batch) - saved
+    if created:
+        cache.invalidate()
+    elapsed = time.monotonic() - started
+    return {
+        'created': created,
+        'skipped': skipped,
+        'seconds': elapsed,
+        'per_second': created / elapsed if elapsed else 0,
+    }
+
+
+def _save_batch(batch):
+    with transaction.atomic():
+        existing = set(
+            News.objects.filter(
+                title__in={news.title for news in batch},
+                date__in={news.date for news in batch},
+            ).values_list('title', 'date')
+        )
+        fresh = []
+        for news in batch:
+            key = (news.title, news.date)
+            if key not in existing:
+                existing.add(key)
+                fresh.append(news)
+        created = News.objects.bulk_create(fresh)
+        search.index_news_many(created)
+    return len(created)
@@ -0,0 +1,41 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from news.importing import import_news, iter_records
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает новости из большого JSON-массива или NDJSON-файла '
+        'потоково, пачками через bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу; «-» — stdin.')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько новостей сохранять за одну транзакцию.',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('Размер пачки должен быть положительным.')
+        if options['path'] == '-':
+            stats = self.load(sys.stdin, options['batch_size'])
+        else:
+            with open(options['path'], encoding='utf-8') as file:
+                stats = self.load(file, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Добавлено: {stats["created"]}, дублей пропущено: '
+            f'{stats["skipped"]}, время: {stats["seconds"]:.1f} с, '
+            f'{stats["per_second"]:.0f} новостей/с.'
+        ))
+
+    def load(self, file, batch_size):
+        try:
+            return import_news(iter_records(file), batch_size)
+        except (ValueError, KeyError) as error:
+            raise CommandError(f'Не удалось разобрать файл: {error!r}')
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from news import cache
+from news.models import News
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сохранённое количество комментариев у новостей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'news_ids',
+            nargs='*',
+            type=int,
+            help='Идентификаторы новостей; по умолчанию — все новости.',
+        )
+
+    def handle(self, *args, **options):
+        queryset = News.objects.all()
+        if options['news_ids']:
+            queryset = queryset.filter(pk__in=options['news_ids'])
+        updated = queryset.update_comment_count()
+        cache.invalidate()
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересчитано новостей: {updated}.')
+        )
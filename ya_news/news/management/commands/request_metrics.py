@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from news import instrumentation, urls
+
+
+class Command(BaseCommand):
+    help = (
+        'Выводит накопленные замеры запросов к страницам новостей: '
+        'среднее число запросов к базе и время на один замеренный ответ.'
+    )
+
+    def handle(self, *args, **options):
+        views = [
+            f'{urls.app_name}:{pattern.name}' for pattern in urls.urlpatterns
+        ]
+        metrics = instrumentation.get_metrics(views)
+        for view, values in metrics.items():
+            requests = values['requests']
+            if not requests:
+                continue
+            self.stdout.write(
+                f'{view:24} ответов: {requests:6}  '
+                f'запросов: {values["queries"] / requests:6.1f}  '
+                f'повторов: {values["duplicates"] / requests:5.1f}  '
+                f'база: {values["db_us"] / requests / 1000:7.2f} мс  '
+                f'шаблон: {values["render_us"] / requests / 1000:7.2f} мс  '
+                f'всего: {values["total_us"] / requests / 1000:7.2f} мс'
+            )
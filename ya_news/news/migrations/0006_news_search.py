@@ -0,0 +1,96 @@
+import re
+from itertools import islice
+
+import snowballstemmer
+from django.conf import settings
+from django.db import migrations
+
+FTS_TABLE = 'news_search'
+WORD = re.compile(r'\w+')
+CHUNK_SIZE = 1000
+
+# В индексе лежат основы слов, а не исходный текст, поэтому таблица
+# хранит собственную копию. rowid: 2 * pk для новости, 2 * pk + 1 для
+# комментария. Миграция индексирует существующие записи так же, как
+# search.rebuild(); дальше индекс ведут сигналы, а пересобрать его можно
+# командой rebuild_news_search.
+CREATE_SQL = (
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, body, news_id UNINDEXED,
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) "
+    "VALUES ('rank', 'bm25(10.0, 1.0)')",
+)
+
+
+def supports_fts5(schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if cursor.fetchone()[0]:
+            return True
+        cursor.execute("PRAGMA module_list")
+        return ('fts5',) in cursor.fetchall()
+
+
+def index_rows(apps, using):
+    """Строки индекса, как их строит search.rebuild()."""
+    stemmer = snowballstemmer.stemmer('russian')
+
+    def normalize(text):
+        words = WORD.findall(text.lower().replace('ё', 'е'))
+        return ' '.join(stemmer.stemWords(words))
+
+    news = apps.get_model('news', 'News').objects.using(using)
+    for pk, title, text in news.values_list('pk', 'title', 'text').iterator(
+        chunk_size=CHUNK_SIZE
+    ):
+        yield pk * 2, normalize(title), normalize(text), pk
+    if not settings.NEWS_SEARCH_COMMENTS:
+        return
+    comments = apps.get_model('news', 'Comment').objects.using(using)
+    for pk, news_id, text in comments.values_list(
+        'pk', 'news_id', 'text'
+    ).iterator(chunk_size=CHUNK_SIZE):
+        yield pk * 2 + 1, '', normalize(text), news_id
+
+
+def populate_fts(apps, schema_editor):
+    """Индексирует уже существующие новости и комментарии пачками."""
+    rows = index_rows(apps, schema_editor.connection.alias)
+    with schema_editor.connection.cursor() as cursor:
+        while chunk := list(islice(rows, CHUNK_SIZE)):
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE}(rowid, title, body, news_id) '
+                'VALUES (%s, %s, %s, %s)',
+                chunk,
+            )
+
+
+def create_fts(apps, schema_editor):
+    if not supports_fts5(schema_editor):
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+    populate_fts(apps, schema_editor)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0005_badword'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,54 @@
+"""Массовая модерация комментариев."""
+from django.conf import settings
+from django.db import connections, router, transaction
+
+from . import cache, search
+from .models import Comment, News
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def delete_comments(queryset, chunk_size=None):
+    """
+    Удаляет комментарии выборки пачками в одной транзакции.
+
+    Удаление идёт запросами DELETE ... WHERE id IN (...) без загрузки
+    объектов и без сигналов на каждый комментарий, поэтому счётчики
+    новостей, поисковый индекс и кеш страниц поправляются здесь же,
+    один раз на всю пачку.
+    Возвращает количество удалённых комментариев.
+    """
+    chunk_size = chunk_size or settings.COMMENTS_MODERATION_CHUNK_SIZE
+    # Выборка на чтение может смотреть в реплику; удаляем в базе для
+    # записи и там же читаем, что удалять.
+    using = router.db_for_write(Comment)
+    with transaction.atomic(using=using):
+        rows = list(
+            queryset.using(using).order_by().values_list('pk', 'news_id')
+        )
+        for chunk in chunked([pk for pk, _ in rows], chunk_size):
+            delete_rows(using, chunk)
+            search.remove_comments(chunk, using)
+        news_ids = sorted({news_id for _, news_id in rows})
+        for chunk in chunked(news_ids, chunk_size):
+            News.objects.using(using).filter(
+                pk__in=chunk
+            ).update_comment_count()
+        transaction.on_commit(cache.invalidate, using=using)
+    return len(rows)
+
+
+def delete_rows(using, pks):
+    """DELETE ... WHERE id IN (...) без загрузки объектов и сигналов."""
+    connection = connections[using]
+    opts = Comment._meta
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {connection.ops.quote_name(opts.db_table)} '
+            f'WHERE {connection.ops.quote_name(opts.pk.column)} '
+            f'IN ({", ".join(["%s"] * len(pks))})',
+            pks,
+        )
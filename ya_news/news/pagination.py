@@ -0,0 +1,104 @@
+"""Постраничный вывод по ключу сортировки (keyset) с курсорами."""
+import base64
+import binascii
+import json
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import BadRequest, ValidationError
+from django.db.models import Q
+
+KeysetPage = namedtuple('KeysetPage', ('object_list', 'next_cursor'))
+
+
+class KeysetPaginator:
+    """
+    Делит выборку на страницы по значениям полей сортировки.
+
+    Вместо OFFSET следующая страница начинается строго после последней
+    записи предыдущей, поэтому стоимость любой страницы одинакова при
+    наличии индекса по полям сортировки. Последним полем должен быть
+    уникальный ключ, иначе порядок не будет однозначным.
+
+    Для выборки values_list() row_factory превращает кортеж в запись
+    страницы; у записи должны быть атрибуты полей сортировки.
+    """
+
+    def __init__(self, queryset, ordering, per_page, row_factory=None):
+        self.queryset = queryset.order_by(*ordering)
+        self.ordering = ordering
+        self.per_page = per_page
+        self.row_factory = row_factory
+        opts = queryset.model._meta
+        self.fields = [
+            opts.pk if name.lstrip('-') == 'pk'
+            else opts.get_field(name.lstrip('-'))
+            for name in ordering
+        ]
+
+    def get_page(self, cursor=None):
+        """Возвращает страницу, начинающуюся после курсора."""
+        return self._make_page(list(self._page_queryset(cursor)))
+
+    async def aget_page(self, cursor=None):
+        """
+        Асинхронный вариант get_page().
+
+        Страница читается одним переходом в поток: aiterator() у выборки
+        values_list() выполняет запрос прямо в цикле событий.
+        """
+        return self._make_page(await sync_to_async(list)(
+            self._page_queryset(cursor)
+        ))
+
+    def _page_queryset(self, cursor):
+        """Записи страницы и одна лишняя — признак следующей страницы."""
+        queryset = self.queryset
+        if cursor:
+            queryset = queryset.filter(self._after(self.decode(cursor)))
+        return queryset[:self.per_page + 1]
+
+    def _make_page(self, object_list):
+        if self.row_factory is not None:
+            object_list = [self.row_factory(row) for row in object_list]
+        next_cursor = None
+        if len(object_list) > self.per_page:
+            object_list = object_list[:self.per_page]
+            next_cursor = self.encode(object_list[-1])
+        return KeysetPage(object_list, next_cursor)
+
+    def encode(self, obj):
+        values = [field.value_to_string(obj) for field in self.fields]
+        raw = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+    def decode(self, cursor):
+        try:
+            padding = '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+            if len(values) != len(self.fields):
+                raise ValueError(cursor)
+            return [
+                field.to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            raise BadRequest('Некорректный курсор страницы.')
+
+    def _after(self, values):
+        """
+        Условие «строго после» для составного ключа.
+
+        Для (a, b) по убыванию это a < x OR (a = x AND b < y).
+        """
+        condition = Q()
+        for index, name in enumerate(self.ordering):
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            prefix = {
+                self.ordering[position].lstrip('-'): values[position]
+                for position in range(index)
+            }
+            condition |= Q(
+                **prefix, **{f'{name.lstrip("-")}__{lookup}': values[index]}
+            )
+        return condition
@@ -0,0 +1,161 @@
+"""Поиск запрещённых слов в тексте за один проход."""
+import logging
+import time
+from collections import deque
+from pathlib import Path
+
+from django.conf import settings
+
+from . import cache
+
+VERSION_KEY = 'news:bad_words:version'
+
+logger = logging.getLogger(__name__)
+
+_matcher = None
+_matcher_key = None
+_file_words = frozenset()
+_file_key = None
+_file_checked = None
+
+
+class BadWordsMatcher:
+    """
+    Автомат Ахо — Корасик над списком запрещённых слов.
+
+    Строится один раз, после чего проверка текста линейна по его длине
+    и не зависит от размера словаря.
+    """
+
+    def __init__(self, words):
+        self.transitions = [{}]
+        self.fail = [0]
+        self.output = [()]
+        for word in words:
+            self._add(word.strip().lower())
+        self._link()
+
+    def _add(self, word):
+        if not word:
+            return
+        state = 0
+        for char in word:
+            next_state = self.transitions[state].get(char)
+            if next_state is None:
+                next_state = len(self.transitions)
+                self.transitions.append({})
+                self.fail.append(0)
+                self.output.append(())
+                self.transitions[state][char] = next_state
+            state = next_state
+        self.output[state] = (word,)
+
+    def _link(self):
+        """Проставляет переходы по неудаче обходом бора в ширину."""
+        queue = deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.transitions[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.transitions[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.transitions[fallback].get(
+                    char, 0
+                )
+                self.output[next_state] += self.output[
+                    self.fail[next_state]
+                ]
+
+    def find_all(self, text):
+        """Возвращает множество запрещённых слов, найденных в тексте."""
+        transitions, fail, output = self.transitions, self.fail, self.output
+        found = set()
+        state = 0
+        for char in text.lower():
+            while state and char not in transitions[state]:
+                state = fail[state]
+            state = transitions[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+def get_version():
+    """Версия словаря в базе, общая для всех процессов через кеш."""
+    words_cache = cache.get_cache()
+    version = words_cache.get(VERSION_KEY)
+    if version is None:
+        words_cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = words_cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    """Отмечает, что словарь в базе изменился."""
+    words_cache = cache.get_cache()
+    try:
+        words_cache.incr(VERSION_KEY)
+    except ValueError:
+        words_cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def _refresh_file():
+    """
+    Перечитывает NEWS_BAD_WORDS_FILE, если он изменился, и возвращает его
+    версию.
+
+    Файл проверяется не чаще раза в NEWS_BAD_WORDS_FILE_CHECK_INTERVAL
+    секунд. Если он пропал или не читается, остаются слова последнего
+    удачного чтения, а в лог пишется предупреждение: из-за словаря
+    отправка комментария не должна падать.
+    """
+    global _file_words, _file_key, _file_checked
+    path = settings.NEWS_BAD_WORDS_FILE
+    if not path:
+        return None
+    now = time.monotonic()
+    if _file_checked is not None and _file_checked[0] == path and (
+        now - _file_checked[1] < settings.NEWS_BAD_WORDS_FILE_CHECK_INTERVAL
+    ):
+        return _file_key
+    _file_checked = (path, now)
+    try:
+        key = (path, Path(path).stat().st_mtime_ns)
+        if key != _file_key:
+            with open(path, encoding='utf-8') as file:
+                _file_words = frozenset(
+                    line.strip() for line in file
+                    if line.strip() and not line.startswith('#')
+                )
+            _file_key = key
+    except OSError as error:
+        logger.warning(
+            'Словарь запрещённых слов %s не прочитан: %s', path, error
+        )
+    return _file_key
+
+
+def _load_words(builtin):
+    from .models import BadWord
+
+    words = set(builtin)
+    if settings.NEWS_BAD_WORDS_FILE:
+        words.update(_file_words)
+    words.update(BadWord.objects.values_list('word', flat=True))
+    return words
+
+
+def get_matcher(builtin=()):
+    """
+    Возвращает автомат для текущего словаря.
+
+    Автомат хранится в памяти процесса и пересобирается, только когда
+    меняется словарь в базе или файл со словами.
+    """
+    global _matcher, _matcher_key
+    key = (get_version(), _refresh_file(), tuple(builtin))
+    if key != _matcher_key:
+        _matcher = BadWordsMatcher(_load_words(builtin))
+        _matcher_key = key
+    return _matcher
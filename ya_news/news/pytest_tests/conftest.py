@@ -2,16 +2,25 @@ from datetime import timedelta
 
 import pytest
 from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.utils import load_backend
 from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 
 from news.models import Comment, News
 
 URL_HOME = 'news:home'
+URL_ARCHIVE = 'news:archive'
+URL_SEARCH = 'news:search'
 URL_DETAIL = 'news:detail'
+URL_COMMENTS = 'news:comments'
 URL_EDIT = 'news:edit'
 URL_DELETE = 'news:delete'
+URL_BULK_DELETE = 'news:bulk_delete'
 URL_LOGIN = 'users:login'
 URL_LOGOUT = 'users:logout'
 URL_SIGNUP = 'users:signup'
@@ -20,8 +29,19 @@ NEWS = 'news'
 FORM = 'form'
 COMMENT_TEXT = 'Первоночальный текст'
 NEW_COMMENT_TEXT = 'Обновлённый комментарий'
+QUERY_BUDGET_SIZES = (1, 5, 25)
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+# Данные создаются заново в каждом тесте. Общий для модуля снимок по
+# образцу setUpTestData пробовали: тесты test_logic, test_content и
+# test_queries рассчитаны на пустую базу (get() без условий, точные
+# количества, импорт фикстур), а на test_routes выигрыш оказался в
+# пределах разброса — медиана 6,86 с против 7,04 с на всём наборе.
 @pytest.fixture
 def author(django_user_model):
     return django_user_model.objects.create(username='Автор')
@@ -50,11 +70,10 @@ def not_author_client(not_author):
 
 @pytest.fixture
 def new():
-    new = News.objects.create(
+    return News.objects.create(
         title='Заголовок Новости',
         text='Текст Новости',
     )
-    return new
 
 
 @pytest.fixture
@@ -82,9 +101,37 @@ def comment(author, new):
         author=author,
         text=COMMENT_TEXT,
     )
+    News.objects.filter(pk=new.pk).update_comment_count()
     return comment
 
 
+@pytest.fixture
+def replica(db, tmp_path, settings, author, comment):
+    """
+    Отдельная база-реплика с копией комментария автора.
+
+    В отличие от TEST: MIRROR это действительно другая база, так что
+    запись, ушедшая не туда, видна по расхождению с основной.
+    """
+    alias = 'replica_test'
+    settings_dict = {
+        **connections['default'].settings_dict,
+        'NAME': str(tmp_path / 'replica.sqlite3'),
+    }
+    # Соединение не объявлено в DATABASES, поэтому тестовый класс
+    # pytest-django не запрещает к нему обращаться.
+    connections[alias] = load_backend(settings_dict['ENGINE']).DatabaseWrapper(
+        settings_dict, alias
+    )
+    call_command('migrate', database=alias, verbosity=0)
+    for obj in (author, comment.news, comment):
+        obj.save(using=alias, force_insert=True)
+    settings.NEWS_READ_REPLICAS = [alias]
+    yield alias
+    connections[alias].close()
+    del connections[alias]
+
+
 @pytest.fixture
 def comments(author, new):
     today = timezone.now()
@@ -96,6 +143,7 @@ def comments(author, new):
             created=today + timedelta(days=index),
         ) for index in range(2)
     ])
+    News.objects.filter(pk=new.pk).update_comment_count()
 
 
 @pytest.fixture
@@ -153,3 +201,34 @@ def url_to_comments(new_id_for_agrs):
     news_url = reverse('news:detail', args=new_id_for_agrs)
     url_to_comments = news_url + '#comments'
     return url_to_comments
+
+
+def assert_query_budget(make_request, prepare, budget,
+                        sizes=QUERY_BUDGET_SIZES):
+    """
+    Проверяет, что страница укладывается в budget запросов к базе.
+
+    Перед каждым замером prepare(size) добавляет size строк, которые
+    выводит страница. Число запросов не должно расти вместе с числом строк:
+    рост означает запрос на строку (N+1). Первый запрос прогревает кеши
+    процесса и в замеры не входит.
+    """
+    make_request()
+    counts = {}
+    for size in sizes:
+        prepare(size)
+        with CaptureQueriesContext(connection) as context:
+            make_request()
+        counts[size] = len(context)
+    assert max(counts.values()) <= budget, (
+        f'Страница превысила бюджет в {budget} запросов: {counts}.'
+    )
+    assert counts[sizes[-1]] <= counts[sizes[0]], (
+        f'Число запросов растёт вместе с числом строк: {counts}.'
+    )
+
+
+@pytest.fixture
+def query_budget():
+    """Проверка бюджета запросов, см. assert_query_budget."""
+    return assert_query_budget
@@ -1,8 +1,24 @@
+from http import HTTPStatus
+from importlib import import_module
+from io import StringIO
+from types import SimpleNamespace
+
 import pytest
+from asgiref.sync import async_to_sync
+from django.apps import apps
 from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.db import connection
+from django.http import Http404
+from django.urls import reverse
 
-from .conftest import FORM, NEWS, OBJECT_LIST
+from .conftest import (
+    FORM, NEWS, OBJECT_LIST, URL_ARCHIVE, URL_COMMENTS, URL_SEARCH
+)
+from news import cache, search, views
 from news.forms import CommentForm
+from news.models import Comment, News
 
 pytestmark = [pytest.mark.django_db]
 
@@ -64,3 +80,205 @@ def test_authorized_client_has_form(author_client, url_detail):
     assert isinstance(response.context[FORM], CommentForm), (
         f'Под ключем "{FORM}" в контекст передалась не та форма.'
     )
+
+
+def test_home_page_cached_for_anonymous(
+    client, url_home, news, django_assert_num_queries
+):
+    """Повторный запрос главной анонимом не обращается к базе."""
+    first = client.get(url_home)
+    with django_assert_num_queries(0):
+        second = client.get(url_home)
+    assert second.content == first.content, (
+        'Из кеша отдалась не та главная страница.'
+    )
+    assert cache.get_stats() == {cache.HIT: 1, cache.MISS: 1}
+
+
+def test_home_page_cache_invalidated_on_comment(
+    client, author_client, url_home, url_detail, form_data
+):
+    """Новый комментарий сбрасывает закешированную главную страницу."""
+    client.get(url_home)
+    author_client.post(url_detail, data=form_data)
+    response = client.get(url_home)
+    assert 'Комментариев: 1' in response.content.decode(), (
+        'После комментария главная страница отдалась из устаревшего кеша.'
+    )
+
+
+def test_archive_pages_cover_all_news(client, news, settings):
+    """Архив по курсорам выводит все новости по одному разу и по порядку."""
+    settings.NEWS_COUNT_ON_ARCHIVE_PAGE = 4
+    url = reverse(URL_ARCHIVE)
+    seen = []
+    cursor = None
+    while True:
+        response = client.get(url, {'cursor': cursor} if cursor else None)
+        page = response.context[OBJECT_LIST]
+        assert len(page) <= settings.NEWS_COUNT_ON_ARCHIVE_PAGE
+        seen.extend(page)
+        cursor = response.context['next_cursor']
+        if cursor is None:
+            break
+    assert len(seen) == News.objects.count(), (
+        'Архив вывел не все новости или повторил некоторые из них.'
+    )
+    assert seen == list(News.objects.order_by('-date', '-pk')), (
+        'Новости в архиве должны идти от новой к старой.'
+    )
+
+
+def test_archive_rejects_broken_cursor(client):
+    """Испорченный курсор даёт ошибку 400, а не 500."""
+    response = client.get(reverse(URL_ARCHIVE), {'cursor': 'не-курсор'})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_detail_renders_first_comments_page(
+    client, comments, comment, url_detail, settings
+):
+    """На странице новости только первая страница комментариев."""
+    settings.COMMENTS_COUNT_ON_PAGE = 2
+    response = client.get(url_detail)
+    assert len(response.context['comments']) == 2, (
+        'На странице новости выведено больше комментариев, чем в настройках.'
+    )
+    next_page = client.get(
+        reverse(URL_COMMENTS, args=(comment.news_id,)),
+        {'cursor': response.context['next_cursor']},
+    )
+    shown = [row.pk for row in response.context['comments']]
+    shown += [row.pk for row in next_page.context['comments']]
+    expected = Comment.objects.order_by('created', 'pk')
+    assert shown == list(expected.values_list('pk', flat=True)), (
+        'Страницы комментариев должны продолжать друг друга без пропусков.'
+    )
+    assert next_page.context['next_cursor'] is None
+
+
+def test_comment_links_only_for_own_comments(
+    author_client, comment, not_author, url_detail
+):
+    """Ссылки правки выводятся по author_id только у своих комментариев."""
+    other = Comment.objects.create(
+        news=comment.news, author=not_author, text='Чужой комментарий'
+    )
+    response = author_client.get(url_detail)
+    content = response.content.decode()
+    assert [row.pk for row in response.context['comments']] == [
+        comment.pk, other.pk
+    ]
+    assert reverse('news:edit', args=(comment.pk,)) in content
+    assert reverse('news:edit', args=(other.pk,)) not in content
+    assert reverse('news:delete', args=(other.pk,)) not in content
+    assert f'<b>{not_author.username}</b>' in content
+
+
+def test_search_matches_word_forms_and_highlights(client, author):
+    """Поиск находит другие формы слова и выделяет совпадения."""
+    found = News.objects.create(
+        title='Студенты победили', text='Победа студентов в конкурсе.'
+    )
+    News.objects.create(title='Погода', text='Завтра снова дождь.')
+    response = client.get(reverse(URL_SEARCH), {'q': 'студент'})
+    object_list = response.context[OBJECT_LIST]
+    assert [news.pk for news in object_list] == [found.pk], (
+        'Поиск должен находить новости по другим формам слова.'
+    )
+    assert '<mark>Студенты</mark>' in object_list[0].highlighted_title
+    assert '<mark>студентов</mark>' in object_list[0].snippet
+
+
+def test_search_finds_news_by_comment(author_client, new, url_detail):
+    """Новость находится по тексту комментария, индекс следует за ним."""
+    author_client.post(url_detail, data={'text': 'Замечательные котики'})
+    response = author_client.get(reverse(URL_SEARCH), {'q': 'котик'})
+    assert list(response.context[OBJECT_LIST]) == [new]
+    Comment.objects.get().delete()
+    response = author_client.get(reverse(URL_SEARCH), {'q': 'котик'})
+    assert list(response.context[OBJECT_LIST]) == []
+
+
+def test_rebuild_news_search_command(client, news):
+    """Команда индексирует новости, созданные в обход сигналов."""
+    assert search.SearchResults('новости').count() == 0
+    call_command('rebuild_news_search', stdout=StringIO())
+    assert search.SearchResults('новости').count() == News.objects.count(), (
+        'После переиндексации находятся не все новости.'
+    )
+    response = client.get(reverse(URL_SEARCH), {'q': 'новости', 'page': 2})
+    assert len(response.context[OBJECT_LIST]) == 1
+
+
+def test_search_migration_indexes_existing_rows(news, comments):
+    """Миграция индекса заполняет его так же, как rebuild_news_search."""
+    migration = import_module('news.migrations.0006_news_search')
+
+    def index():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, title, body, news_id FROM {search.FTS_TABLE} '
+                'ORDER BY rowid'
+            )
+            return cursor.fetchall()
+
+    search.rebuild()
+    expected = index()
+    assert expected
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {search.FTS_TABLE}')
+    migration.populate_fts(apps, SimpleNamespace(connection=connection))
+    assert index() == expected
+
+
+def test_search_page_size_read_per_request(client, news, settings):
+    """Размер страницы поиска берётся из настроек на каждый запрос."""
+    search.rebuild()
+    settings.NEWS_COUNT_ON_SEARCH_PAGE = 2
+    response = client.get(reverse(URL_SEARCH), {'q': 'новости'})
+    assert len(response.context[OBJECT_LIST]) == 2
+
+
+def call_async_view(view_class, request, user, **kwargs):
+    """Вызывает асинхронное представление вне ASGI-обработчика."""
+    async def auser():
+        return user
+
+    request.auser = auser
+    return async_to_sync(view_class.as_view())(request, **kwargs)
+
+
+def test_async_home_matches_sync(client, url_home, rf, news):
+    """Асинхронная главная выводит те же новости и кеширует страницу."""
+    expected = list(client.get(url_home).context[OBJECT_LIST])
+    cache.get_cache().clear()
+    response = call_async_view(
+        views.AsyncNewsList, rf.get(url_home), AnonymousUser()
+    )
+    assert response.status_code == HTTPStatus.OK
+    for item in expected:
+        assert item.title in response.content.decode()
+    call_async_view(views.AsyncNewsList, rf.get(url_home), AnonymousUser())
+    assert cache.get_stats() == {cache.HIT: 1, cache.MISS: 1}
+
+
+def test_async_detail(rf, author, new, comments, url_detail):
+    """Асинхронная страница новости выводит комментарии и форму автору."""
+    response = call_async_view(
+        views.AsyncNewsDetail, rf.get(url_detail), author, pk=new.pk
+    )
+    content = response.content.decode()
+    assert response.status_code == HTTPStatus.OK
+    positions = [
+        content.index(comment.text)
+        for comment in new.comment_set.order_by('created')
+    ]
+    assert positions == sorted(positions), (
+        'Комментарии должны идти от старых к новым.'
+    )
+    assert 'csrfmiddlewaretoken' in content
+    with pytest.raises(Http404):
+        call_async_view(
+            views.AsyncNewsDetail, rf.get(url_detail), author, pk=new.pk + 1
+        )
@@ -1,12 +1,26 @@
+import contextvars
+import json
+import os
+import time
 from http import HTTPStatus
+from io import StringIO
 
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.urls import reverse
 from pytest_django.asserts import assertFormError, assertRedirects
 
-from .conftest import COMMENT_TEXT, NEW_COMMENT_TEXT
-from news.forms import BAD_WORDS, WARNING
-from news.models import Comment, News
+from .conftest import COMMENT_TEXT, NEW_COMMENT_TEXT, URL_BULK_DELETE
+from news import ratelimit, search
+from news.forms import BAD_WORDS, WARNING, CommentForm
+from news.models import BadWord, Comment, News
+from news.moderation import delete_comments
+from news.profanity import BadWordsMatcher
+from news.routers import PIN_COOKIE, ReplicaRouter, pinned_to_primary
+from news.signals import configure_sqlite
 
 
 @pytest.mark.django_db
@@ -129,3 +143,358 @@ def test_user_cant_edit_comment_of_another_user(
     assert comment.text == COMMENT_TEXT, (
         'Пользователь смог отредактировать чужой комментарий.'
     )
+
+
+def test_comment_count_follows_create_and_delete(
+    author_client, form_data, url_detail, url_delete, comment
+):
+    """Проверяет, что счётчик комментариев меняется вместе с ними."""
+    news = comment.news
+    news.refresh_from_db()
+    assert news.comment_count == 1
+    author_client.post(url_detail, data=form_data)
+    news.refresh_from_db()
+    assert news.comment_count == 2, (
+        'После добавления комментария счётчик у новости не увеличился.'
+    )
+    author_client.delete(url_delete)
+    news.refresh_from_db()
+    assert news.comment_count == 1, (
+        'После удаления комментария счётчик у новости не уменьшился.'
+    )
+
+
+def test_delete_repairs_drifted_comment_count(
+    author_client, url_delete, url_to_comments, comment
+):
+    """Разошедшийся счётчик не превращает удаление в ошибку 500."""
+    News.objects.update(comment_count=0)
+    response = author_client.delete(url_delete)
+    assertRedirects(response, url_to_comments)
+    comment.news.refresh_from_db()
+    assert comment.news.comment_count == 0
+
+
+@pytest.mark.django_db
+def test_recount_comments_command_repairs_counter(comments, new):
+    """Проверяет, что команда recount_comments чинит счётчик."""
+    News.objects.update(comment_count=0)
+    call_command('recount_comments', stdout=StringIO())
+    new.refresh_from_db()
+    assert new.comment_count == Comment.objects.filter(news=new).count(), (
+        'Команда recount_comments не восстановила счётчик комментариев.'
+    )
+
+
+def test_bad_words_matcher_reports_all_terms():
+    """Автомат находит все запрещённые слова, в том числе вложенные."""
+    matcher = BadWordsMatcher(('he', 'she', 'hers', 'негодяй'))
+    assert matcher.find_all('USHERS и НЕГОДЯЙ') == {
+        'he', 'she', 'hers', 'негодяй'
+    }
+    assert matcher.find_all('чистый текст') == set()
+
+
+@pytest.mark.django_db
+def test_bad_words_from_database_and_file(tmp_path, settings):
+    """Словарь пополняется из базы и файла без перезапуска процесса."""
+    words_file = tmp_path / 'bad_words.txt'
+    words_file.write_text('# комментарий\nбалбес\n', encoding='utf-8')
+    settings.NEWS_BAD_WORDS_FILE = str(words_file)
+    form = CommentForm(data={'text': 'Ты балбес'})
+    assert not form.is_valid()
+    assert form.bad_words == {'балбес'}
+    BadWord.objects.create(word='Бездельник')
+    form = CommentForm(data={'text': 'Бездельник!'})
+    assert not form.is_valid(), (
+        'Слово, добавленное в базу, не попало в проверку комментариев.'
+    )
+    assert form.errors['text'] == [WARNING]
+
+
+@pytest.mark.django_db
+def test_bad_words_file_unavailable(tmp_path, settings, caplog):
+    """
+    Пропавший файл словаря не ломает отправку комментария.
+
+    Остаются слова последнего удачного чтения, в лог идёт предупреждение.
+    """
+    words_file = tmp_path / 'bad_words.txt'
+    words_file.write_text('балбес\n', encoding='utf-8')
+    settings.NEWS_BAD_WORDS_FILE = str(words_file)
+    settings.NEWS_BAD_WORDS_FILE_CHECK_INTERVAL = 0
+    assert not CommentForm(data={'text': 'Ты балбес'}).is_valid()
+    words_file.unlink()
+    form = CommentForm(data={'text': 'Ты балбес'})
+    assert not form.is_valid(), (
+        'Без файла словаря пропали слова последнего удачного чтения.'
+    )
+    assert 'не прочитан' in caplog.text
+    settings.NEWS_BAD_WORDS_FILE = str(tmp_path / 'missing.txt')
+    assert CommentForm(data={'text': 'Чистый текст'}).is_valid()
+
+
+@pytest.mark.django_db
+def test_bad_words_file_checked_once_per_interval(tmp_path, settings):
+    """Файл словаря проверяется не на каждый комментарий."""
+    words_file = tmp_path / 'bad_words.txt'
+    words_file.write_text('балбес\n', encoding='utf-8')
+    settings.NEWS_BAD_WORDS_FILE = str(words_file)
+    settings.NEWS_BAD_WORDS_FILE_CHECK_INTERVAL = 60
+    assert CommentForm(data={'text': 'Ты бездельник'}).is_valid()
+    words_file.write_text('балбес\nбездельник\n', encoding='utf-8')
+    os.utime(words_file, ns=(0, 0))
+    assert CommentForm(data={'text': 'Ты бездельник'}).is_valid()
+    settings.NEWS_BAD_WORDS_FILE_CHECK_INTERVAL = 0
+    assert not CommentForm(data={'text': 'Ты бездельник'}).is_valid()
+
+
+def test_moderator_bulk_deletes_comments(
+    client, author, not_author, new, comments, comment
+):
+    """Модератор удаляет все комментарии автора одним запросом."""
+    Comment.objects.create(news=new, author=not_author, text='Не спам')
+    News.objects.filter(pk=new.pk).update_comment_count()
+    moderator = get_user_model().objects.create(
+        username='Модератор', is_superuser=True
+    )
+    client.force_login(moderator)
+    response = client.post(
+        reverse(URL_BULK_DELETE), data={'author': author.pk}
+    )
+    assert response.json() == {'deleted': 3}
+    assert list(Comment.objects.values_list('author', flat=True)) == [
+        not_author.pk
+    ], 'Удалились не те комментарии.'
+    new.refresh_from_db()
+    assert new.comment_count == 1, (
+        'После массового удаления счётчик комментариев не пересчитан.'
+    )
+
+
+@pytest.mark.parametrize(
+    'data',
+    [{}, {'ids': 'не-число'}],
+)
+def test_bulk_delete_rejects_bad_filter(admin_client, comment, data):
+    """Без условий отбора или с мусором в ids ничего не удаляется."""
+    response = admin_client.post(reverse(URL_BULK_DELETE), data=data)
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert Comment.objects.count() == 1
+
+
+def test_admin_comment_changes_update_counters(admin_client, author, new):
+    """Добавление и перенос комментария в админке пересчитывают счётчики."""
+    other = News.objects.create(title='Другая новость', text='Текст')
+    data = {
+        'news': new.pk,
+        'author': author.pk,
+        'text': COMMENT_TEXT,
+    }
+    admin_client.post(reverse('admin:news_comment_add'), data=data)
+    comment = Comment.objects.get()
+    new.refresh_from_db()
+    assert new.comment_count == 1
+    admin_client.post(
+        reverse('admin:news_comment_change', args=(comment.pk,)),
+        data={**data, 'news': other.pk},
+    )
+    new.refresh_from_db()
+    other.refresh_from_db()
+    assert (new.comment_count, other.comment_count) == (0, 1), (
+        'Счётчики старой и новой новости не пересчитаны.'
+    )
+
+
+def test_user_cant_bulk_delete_comments(author_client, comment):
+    """Обычный пользователь не может массово удалять комментарии."""
+    response = author_client.post(
+        reverse(URL_BULK_DELETE), data={'ids': comment.pk}
+    )
+    assert response.status_code == HTTPStatus.FORBIDDEN
+    assert Comment.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_import_news_from_fixture_array(settings):
+    """Команда import_news загружает фикстуру и не дублирует новости."""
+    fixture = settings.BASE_DIR / 'news' / 'fixtures' / 'news.json'
+    call_command('import_news', str(fixture), batch_size=3, stdout=StringIO())
+    imported = News.objects.count()
+    assert imported == len(json.loads(fixture.read_text(encoding='utf-8')))
+    call_command('import_news', str(fixture), stdout=StringIO())
+    assert News.objects.count() == imported, (
+        'Повторный импорт того же файла создал дубли.'
+    )
+
+
+@pytest.mark.django_db
+def test_import_news_from_ndjson(tmp_path):
+    """NDJSON читается построчно, дубли внутри файла пропускаются."""
+    path = tmp_path / 'news.ndjson'
+    path.write_text(
+        '{"title": "Первая", "text": "Текст", "date": "2024-01-02"}\n'
+        '\n'
+        '{"title": "Первая", "text": "Копия", "date": "2024-01-02"}\n'
+        '{"title": "Первая", "text": "Другой день", "date": "2024-01-03"}\n',
+        encoding='utf-8',
+    )
+    out = StringIO()
+    call_command('import_news', str(path), stdout=out)
+    assert News.objects.count() == 2
+    assert 'дублей пропущено: 1' in out.getvalue()
+    assert search.SearchResults('первая').count() == 2, (
+        'Импортированные новости не попали в поисковый индекс.'
+    )
+
+
+@pytest.mark.django_db
+def test_reimport_skips_undated_news(tmp_path):
+    """Новость без даты при повторном импорте считается дублем."""
+    path = tmp_path / 'news.ndjson'
+    path.write_text('{"title": "Без даты", "text": "Текст"}\n')
+    call_command('import_news', str(path), stdout=StringIO())
+    call_command('import_news', str(path), stdout=StringIO())
+    assert News.objects.count() == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'content, where',
+    [
+        ('{"title": "Первая"}\n\n["не", "объект"]\n', 'Строка 3'),
+        ('[{"title": "Первая"}, "строка"]', 'Элемент 2 массива'),
+        ('{"fields": [1, 2]}\n', 'Поле fields'),
+    ],
+)
+def test_import_rejects_non_object_records(tmp_path, content, where):
+    """Запись не-объект даёт понятную ошибку с местом, а не traceback."""
+    path = tmp_path / 'news.json'
+    path.write_text(content, encoding='utf-8')
+    with pytest.raises(CommandError, match=where):
+        call_command('import_news', str(path), stdout=StringIO())
+    assert not News.objects.exists()
+
+
+@pytest.mark.django_db
+def test_sqlite_pragmas_applied_to_new_connection(settings):
+    """Прагмы из SQLITE_PRAGMAS выставляются новому соединению."""
+    settings.SQLITE_PRAGMAS = {'busy_timeout': 1234}
+    configure_sqlite(connection=connection)
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA busy_timeout')
+        assert cursor.fetchone()[0] == 1234
+
+
+def test_reads_routed_to_replicas_until_write(settings, django_user_model):
+    """Новости читаются с реплик, пока в запросе не было записи."""
+    settings.NEWS_READ_REPLICAS = ['replica_0', 'replica_1']
+    router = ReplicaRouter()
+
+    def request():
+        pinned_to_primary.set(False)
+        assert router.db_for_read(News) in settings.NEWS_READ_REPLICAS
+        assert router.db_for_read(django_user_model) is None, (
+            'Пользователи и сессии должны читаться из основной базы.'
+        )
+        assert router.db_for_write(Comment) == 'default'
+        assert router.db_for_read(News) is None, (
+            'После записи чтение должно идти из основной базы.'
+        )
+
+    contextvars.copy_context().run(request)
+
+
+@pytest.mark.parametrize(
+    'name, data',
+    (('news:edit', {'text': NEW_COMMENT_TEXT}), ('news:delete', None)),
+)
+def test_comment_changes_written_to_primary(
+    name, data, replica, author_client, comment
+):
+    """Правка и удаление комментария с реплики идут в основную базу."""
+    author_client.post(reverse(name, args=(comment.pk,)), data=data)
+    on_primary = Comment.objects.using('default').filter(pk=comment.pk)
+    on_replica = Comment.objects.using(replica).get(pk=comment.pk)
+    assert on_replica.text == COMMENT_TEXT, 'Запись ушла на реплику.'
+    if data is None:
+        assert not on_primary.exists()
+        assert News.objects.using('default').get(
+            pk=comment.news_id
+        ).comment_count == 0
+    else:
+        assert on_primary.get().text == NEW_COMMENT_TEXT
+
+
+def test_bulk_delete_written_to_primary(replica, comment):
+    """Массовое удаление при включённых репликах идёт в основную базу."""
+
+    def moderate():
+        # Записи фикстур закрепили чтение за основной базой; модератор
+        # приходит с чистым запросом.
+        pinned_to_primary.set(False)
+        return delete_comments(Comment.objects.filter(pk=comment.pk))
+
+    assert contextvars.copy_context().run(moderate) == 1
+    assert not Comment.objects.using('default').filter(
+        pk=comment.pk
+    ).exists()
+    assert Comment.objects.using(replica).filter(pk=comment.pk).exists(), (
+        'Удаление ушло на реплику.'
+    )
+    assert News.objects.using('default').get(
+        pk=comment.news_id
+    ).comment_count == 0
+
+
+def test_comment_pins_author_to_primary(
+    author_client, url_detail, form_data, settings
+):
+    """После комментария автор получает cookie чтения из основной базы."""
+    response = author_client.post(url_detail, data=form_data)
+    cookie = response.cookies[PIN_COOKIE]
+    assert cookie['max-age'] == settings.NEWS_REPLICA_LAG
+    response = author_client.get(url_detail)
+    assert PIN_COOKIE not in response.cookies, (
+        'Чтение не должно продлевать закрепление за основной базой.'
+    )
+
+
+@pytest.mark.django_db
+def test_comment_rate_limit(author_client, url_detail, form_data, settings):
+    """Сверх лимита комментарий не сохраняется, ответ — 429."""
+    settings.NEWS_RATELIMITS = {'comment': '2/m'}
+    for _ in range(2):
+        author_client.post(url_detail, data=form_data)
+    response = author_client.post(url_detail, data=form_data)
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert int(response.headers['Retry-After']) > 0
+    assert Comment.objects.count() == 2
+
+
+def test_rate_limit_window_slides():
+    """Лимит восстанавливается по мере ухода прошлых запросов из окна."""
+    assert ratelimit.hit('test', 'ident', '2/m', now=0) == 0
+    assert ratelimit.hit('test', 'ident', '2/m', now=0) == 0
+    assert ratelimit.hit('test', 'ident', '2/m', now=0) == 90
+    assert ratelimit.hit('test', 'ident', '2/m', now=89) == 1
+    assert ratelimit.hit('test', 'ident', '2/m', now=90) == 0
+
+
+@pytest.mark.parametrize('rate', ('0/m', '-1/h'))
+def test_rate_limit_rejects_zero_limit(rate):
+    """Частота без единого разрешённого запроса — ошибка настройки."""
+    with pytest.raises(ImproperlyConfigured):
+        ratelimit.hit('test', 'ident', rate)
+
+
+def test_rate_limit_overhead():
+    """Проверка лимита не должна заметно замедлять запрос."""
+    calls = 1000
+    started = time.perf_counter()
+    for _ in range(calls):
+        ratelimit.hit('test', 'ident', f'{calls}/m')
+    per_call = (time.perf_counter() - started) / calls
+    assert per_call < 0.001, (
+        f'Проверка лимита заняла {per_call * 1e6:.0f} мкс на запрос.'
+    )
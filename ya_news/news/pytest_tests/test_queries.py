@@ -0,0 +1,350 @@
+import re
+import time
+from http import HTTPStatus
+from io import StringIO
+from itertools import count
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser, Permission
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from .conftest import client_authorization
+from news import views
+from news.instrumentation import InstrumentationMiddleware, QueryRecorder
+from news.models import Comment, News
+
+pytestmark = [pytest.mark.django_db]
+
+SESSION_QUERIES = 2
+SEARCH_INDEX_QUERIES = 1
+# Точка сохранения транзакции внутри теста.
+SAVEPOINT_QUERIES = 2
+
+usernames = (f'Читатель {index}' for index in count())
+
+
+def add_news(size):
+    """Новости по одной: так срабатывают сигналы кеша и поиска."""
+    for index in range(size):
+        News.objects.create(title=f'Новость {index}', text='Прогноз погоды')
+
+
+def add_comments(news, size, author=None):
+    """Комментарии разных авторов, чтобы заметить запрос на автора."""
+    for _ in range(size):
+        Comment.objects.create(
+            news=news,
+            author=author or get_user_model().objects.create(
+                username=next(usernames)
+            ),
+            text='Комментарий',
+        )
+    News.objects.filter(pk=news.pk).update_comment_count()
+
+
+@pytest.mark.parametrize(
+    'client_fixture, name, args, expected',
+    [
+        ('client', 'news:home', None, 1),
+        ('author_client', 'news:home', None, SESSION_QUERIES + 1),
+        ('client', 'news:archive', None, 1),
+        ('client', 'news:detail', pytest.lazy_fixture('new_id_for_agrs'), 2),
+        (
+            'author_client',
+            'news:detail',
+            pytest.lazy_fixture('new_id_for_agrs'),
+            SESSION_QUERIES + 2,
+        ),
+        ('client', 'news:comments', pytest.lazy_fixture('new_id_for_agrs'), 1),
+        (
+            'author_client',
+            'news:edit',
+            pytest.lazy_fixture('comment_id_for_agrs'),
+            SESSION_QUERIES + 1,
+        ),
+        (
+            'author_client',
+            'news:delete',
+            pytest.lazy_fixture('comment_id_for_agrs'),
+            SESSION_QUERIES + 1,
+        ),
+    ]
+)
+def test_get_queries(
+    client_fixture, name, args, expected, request, django_assert_num_queries
+):
+    """Фиксирует количество запросов к базе при открытии страниц."""
+    client = request.getfixturevalue(client_fixture)
+    url = reverse(name, args=args)
+    with django_assert_num_queries(expected):
+        client.get(url)
+
+
+def test_create_comment_queries(
+    author_client, url_detail, form_data, django_assert_num_queries
+):
+    """
+    Сессия, пользователь, новость, вставка комментария, счётчик и
+    поисковый индекс.
+
+    Ещё два запроса — точка сохранения транзакции внутри теста. Первый
+    запрос прогревает словарь запрещённых слов.
+    """
+    author_client.post(url_detail, data=form_data)
+    with django_assert_num_queries(
+        SESSION_QUERIES + 3 + SEARCH_INDEX_QUERIES + 2
+    ):
+        author_client.post(url_detail, data=form_data)
+
+
+def test_edit_comment_queries(
+    author_client, url_edit, form_data_other, django_assert_num_queries
+):
+    """
+    Сессия, пользователь, комментарий с новостью, обновление и
+    поисковый индекс.
+
+    Первый запрос прогревает словарь запрещённых слов.
+    """
+    author_client.post(url_edit, data=form_data_other)
+    with django_assert_num_queries(
+        SESSION_QUERIES + 2 + SEARCH_INDEX_QUERIES
+    ):
+        author_client.post(url_edit, data=form_data_other)
+
+
+@pytest.mark.parametrize('method', ['post', 'delete'])
+def test_delete_comment_queries(
+    author_client, url_delete, method, django_assert_num_queries
+):
+    """
+    Сессия, пользователь, комментарий, удаление, счётчик и поисковый
+    индекс.
+
+    Ещё два запроса — точка сохранения транзакции внутри теста.
+    """
+    with django_assert_num_queries(
+        SESSION_QUERIES + 3 + SEARCH_INDEX_QUERIES + 2
+    ):
+        getattr(author_client, method)(url_delete)
+
+
+@pytest.mark.parametrize(
+    'client_fixture, name',
+    [
+        ('client', 'news:home'),
+        ('author_client', 'news:home'),
+        ('client', 'news:detail'),
+        ('author_client', 'news:detail'),
+    ]
+)
+def test_not_modified_without_queries(
+    client_fixture, name, new, request, django_assert_num_queries
+):
+    """Неизменная страница отдаётся с кодом 304 без запросов к базе."""
+    client = request.getfixturevalue(client_fixture)
+    url = reverse(name, args=(new.pk,) if name == 'news:detail' else None)
+    response = client.get(url)
+    etag = response.headers['ETag']
+    with django_assert_num_queries(0):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    response = client.get(
+        url, HTTP_IF_MODIFIED_SINCE=response.headers['Last-Modified']
+    )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_new_comment_changes_etag(
+    author_client, client, url_detail, form_data
+):
+    """После нового комментария страница отдаётся заново."""
+    etag = client.get(url_detail).headers['ETag']
+    author_client.post(url_detail, data=form_data)
+    response = client.get(url_detail, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['ETag'] != etag
+
+
+def test_validators_expire(client, url_detail, settings, monkeypatch):
+    """
+    Версия данных в кеше живёт NEWS_CACHE_VALIDATOR_TIMEOUT секунд.
+
+    Так процесс с locmem, пропустивший сброс в другом процессе, перестаёт
+    отвечать 304 на устаревшую страницу не позже этого срока.
+    """
+    settings.NEWS_CACHE_VALIDATOR_TIMEOUT = 60
+    response = client.get(url_detail)
+    etag = response.headers['ETag']
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 61)
+    response = client.get(
+        url_detail,
+        HTTP_IF_NONE_MATCH=etag,
+        HTTP_IF_MODIFIED_SINCE=response.headers['Last-Modified'],
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['ETag'] != etag
+
+
+def test_server_timing(author_client, url_detail, settings):
+    """Замеренный ответ несёт Server-Timing и попадает в агрегаты."""
+    settings.NEWS_INSTRUMENTATION_SAMPLE_RATE = 1
+    response = author_client.get(url_detail)
+    timing = response.headers['Server-Timing']
+    for metric in ('db;dur=', 'dup;desc=', 'render;dur=', 'total;dur='):
+        assert metric in timing
+    output = StringIO()
+    call_command('request_metrics', stdout=output)
+    assert 'news:detail' in output.getvalue()
+
+
+def test_server_timing_counts_async_view_queries(
+    client, rf, new, comments, url_detail, settings
+):
+    """Под ASGI замер видит запросы асинхронного ORM из его потока."""
+    settings.NEWS_INSTRUMENTATION_SAMPLE_RATE = 1
+    expected = client.get(url_detail).headers['Server-Timing']
+
+    async def auser():
+        return AnonymousUser()
+
+    async def get_response(request):
+        return await views.AsyncNewsDetail.as_view()(request, pk=new.pk)
+
+    request = rf.get(url_detail)
+    request.auser = auser
+    request.resolver_match = resolve(url_detail)
+    middleware = InstrumentationMiddleware(get_response)
+    timing = async_to_sync(middleware)(request).headers['Server-Timing']
+    queries = re.search(r'desc="(\d+) queries"', timing).group(1)
+    assert queries == re.search(r'desc="(\d+) queries"', expected).group(1)
+    assert int(queries) > 0
+    assert 'render;dur=0.00' not in timing
+
+
+def test_server_timing_counts_replica_queries(
+    replica, client, url_detail, settings, monkeypatch
+):
+    """Запросы, ушедшие на реплику, тоже попадают в замер."""
+    settings.NEWS_INSTRUMENTATION_SAMPLE_RATE = 1
+    # Фикстура заводит реплику в обход DATABASES; объявляем её, чтобы
+    # middleware видел её так же, как реплики из настроек.
+    monkeypatch.setitem(
+        connections.settings, replica, connections[replica].settings_dict
+    )
+    with CaptureQueriesContext(connections[replica]) as on_replica:
+        with CaptureQueriesContext(connection) as on_primary:
+            timing = client.get(url_detail).headers['Server-Timing']
+    assert len(on_replica) > 0, 'Страница не читала с реплики.'
+    queries = int(re.search(r'desc="(\d+) queries"', timing).group(1))
+    assert queries == len(on_replica) + len(on_primary)
+
+
+def test_not_sampled_request_has_no_timing(client, url_home, settings):
+    settings.NEWS_INSTRUMENTATION_SAMPLE_RATE = 0
+    assert 'Server-Timing' not in client.get(url_home).headers
+
+
+def test_repeated_queries_detected(news):
+    """Одинаковый запрос в цикле распознаётся как возможный N+1."""
+    news = list(News.objects.all()[:3])
+    recorder = QueryRecorder()
+    with connection.execute_wrapper(recorder):
+        for item in news:
+            list(item.comment_set.all())
+    assert recorder.count == 3
+    assert recorder.duplicates == 2
+    assert list(recorder.repeated().values()) == [3]
+
+
+@pytest.mark.parametrize(
+    'client_fixture, name, rows, budget',
+    [
+        ('client', 'news:home', 'news', 1),
+        ('author_client', 'news:home', 'news', SESSION_QUERIES + 1),
+        ('client', 'news:archive', 'news', 1),
+        ('client', 'news:search', 'news', 3),
+        ('client', 'news:detail', 'comments', 2),
+        ('author_client', 'news:detail', 'comments', SESSION_QUERIES + 2),
+        ('client', 'news:comments', 'comments', 1),
+        ('author_client', 'news:edit', 'comments', SESSION_QUERIES + 1),
+        ('author_client', 'news:delete', 'comments', SESSION_QUERIES + 1),
+    ]
+)
+def test_get_query_budget(
+    client_fixture, name, rows, budget, request, new, comment, query_budget
+):
+    """Число запросов страницы не зависит от числа новостей и комментариев."""
+    client = request.getfixturevalue(client_fixture)
+    args = {
+        'news:detail': (new.pk,),
+        'news:comments': (new.pk,),
+        'news:edit': (comment.pk,),
+        'news:delete': (comment.pk,),
+    }.get(name)
+    url = reverse(name, args=args)
+    data = {'q': 'погода'} if name == 'news:search' else None
+    if rows == 'news':
+        prepare = add_news
+    else:
+        def prepare(size):
+            add_comments(new, size)
+    query_budget(lambda: client.get(url, data), prepare, budget)
+
+
+def test_create_comment_query_budget(
+    author_client, new, url_detail, form_data, query_budget
+):
+    query_budget(
+        lambda: author_client.post(url_detail, data=form_data),
+        lambda size: add_comments(new, size),
+        SESSION_QUERIES + 3 + SEARCH_INDEX_QUERIES + SAVEPOINT_QUERIES,
+    )
+
+
+@pytest.mark.parametrize('name', ['news:edit', 'news:delete'])
+def test_change_comment_query_budget(
+    name, author, author_client, new, comment, form_data_other, query_budget
+):
+    targets = [comment.pk]
+
+    def prepare(size):
+        add_comments(new, size)
+        targets.append(
+            Comment.objects.create(news=new, author=author, text='Мой').pk
+        )
+
+    def make_request():
+        url = reverse(name, args=(targets[-1],))
+        author_client.post(url, data=form_data_other)
+        if name == 'news:delete':
+            targets.pop()
+
+    query_budget(
+        make_request,
+        prepare,
+        SESSION_QUERIES + 3 + SEARCH_INDEX_QUERIES + SAVEPOINT_QUERIES,
+    )
+
+
+def test_bulk_delete_query_budget(
+    author, not_author, new, query_budget
+):
+    """Массовое удаление не делает запрос на каждый комментарий."""
+    author.user_permissions.add(
+        Permission.objects.get(codename='delete_comment')
+    )
+    client = client_authorization(author)
+    query_budget(
+        lambda: client.post(
+            reverse('news:bulk_delete'), {'author': not_author.pk}
+        ),
+        lambda size: add_comments(new, size, author=not_author),
+        SESSION_QUERIES + 9,
+    )
@@ -11,7 +11,10 @@ pytestmark = [pytest.mark.django_db]
     'name, expected_path, args',
     [
         ('news:home', '/', None),
+        ('news:archive', '/archive/', None),
+        ('news:search', '/search/', None),
         ('news:detail', '/news/1/', [1]),
+        ('news:comments', '/news/1/comments/', [1]),
         ('news:edit', '/edit_comment/1/', [1]),
         ('news:delete', '/delete_comment/1/', [1]),
         ('users:login', '/auth/login/', None),
@@ -36,7 +39,10 @@ def test_reverse_names(name, expected_path, args):
     'name, args',
     [
         ('news:home', None),
+        ('news:archive', None),
+        ('news:search', None),
         ('news:detail', pytest.lazy_fixture('new_id_for_agrs')),
+        ('news:comments', pytest.lazy_fixture('new_id_for_agrs')),
         ('users:login', None),
         ('users:signup', None),
     ]
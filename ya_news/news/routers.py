@@ -0,0 +1,102 @@
+"""Чтение новостей с реплик и «липкость» к основной базе после записи."""
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE = 'news_primary'
+
+pinned_to_primary = ContextVar('news_pinned_to_primary', default=False)
+wrote_to_primary = ContextVar('news_wrote_to_primary', default=False)
+
+
+class ReplicaRouter:
+    """
+    Читает модели приложения news со случайной реплики.
+
+    После записи в рамках запроса и, по cookie, ещё NEWS_REPLICA_LAG секунд
+    чтение идёт из основной базы, чтобы автор сразу видел свой комментарий.
+    """
+
+    app_labels = {'news'}
+
+    def db_for_read(self, model, **hints):
+        if (
+            model._meta.app_label not in self.app_labels
+            or pinned_to_primary.get()
+            or not settings.NEWS_READ_REPLICAS
+        ):
+            return None
+        return random.choice(settings.NEWS_READ_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        """
+        Пишем только в основную базу.
+
+        None здесь не годится: Django взял бы базу из instance._state.db, и
+        объект, прочитанный с реплики, записался бы обратно на реплику.
+        """
+        if model._meta.app_label in self.app_labels:
+            wrote_to_primary.set(True)
+            pinned_to_primary.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Реплики — копии основной базы, связи между ними допустимы."""
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        """Схему реплик приносит репликация, а не migrate."""
+        return db not in settings.NEWS_READ_REPLICAS
+
+
+class PrimaryPinningMiddleware:
+    """Ставит и учитывает cookie, закрепляющую чтение за основной базой."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        tokens = self.pin(request)
+        try:
+            return self.remember_write(self.get_response(request))
+        finally:
+            self.unpin(tokens)
+
+    async def __acall__(self, request):
+        tokens = self.pin(request)
+        try:
+            return self.remember_write(await self.get_response(request))
+        finally:
+            self.unpin(tokens)
+
+    def pin(self, request):
+        return (
+            pinned_to_primary.set(PIN_COOKIE in request.COOKIES),
+            wrote_to_primary.set(False),
+        )
+
+    def unpin(self, tokens):
+        pinned, wrote = tokens
+        pinned_to_primary.reset(pinned)
+        wrote_to_primary.reset(wrote)
+
+    def remember_write(self, response):
+        if wrote_to_primary.get():
+            response.set_cookie(
+                PIN_COOKIE,
+                '1',
+                max_age=settings.NEWS_REPLICA_LAG,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
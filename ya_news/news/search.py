@@ -0,0 +1,228 @@
+"""Полнотекстовый поиск по новостям и комментариям."""
+import re
+
+import snowballstemmer
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.utils.html import escape, format_html
+from django.utils.safestring import mark_safe
+
+from .models import Comment, News
+
+FTS_TABLE = 'news_search'
+WORD = re.compile(r'(\w+)')
+SNIPPET_WORDS = 30
+
+_stemmer = snowballstemmer.stemmer('russian')
+_fts_tables = {}
+
+
+def stem_words(text):
+    """Основы слов текста: «новостей» и «новость» дают «новост»."""
+    words = WORD.findall(text.lower().replace('ё', 'е'))
+    return _stemmer.stemWords(words)
+
+
+def normalize(text):
+    return ' '.join(stem_words(text))
+
+
+def fts_available(using):
+    """Есть ли в базе индекс FTS5 (создаётся миграцией только в SQLite)."""
+    if using not in _fts_tables:
+        connection = connections[using]
+        _fts_tables[using] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_tables[using]
+
+
+def news_rowid(pk):
+    return pk * 2
+
+
+def comment_rowid(pk):
+    return pk * 2 + 1
+
+
+def _write(using, rows):
+    """Добавляет или заменяет строки индекса (rowid, title, body, news_id)."""
+    if not rows or not fts_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.executemany(
+            f'INSERT OR REPLACE INTO {FTS_TABLE}(rowid, title, body, news_id) '
+            'VALUES (%s, %s, %s, %s)',
+            rows,
+        )
+
+
+def _remove(using, rowids):
+    if not rowids or not fts_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [(rowid,) for rowid in rowids],
+        )
+
+
+def news_row(news):
+    return (
+        news_rowid(news.pk), normalize(news.title), normalize(news.text),
+        news.pk,
+    )
+
+
+def comment_row(comment):
+    return (comment_rowid(comment.pk), '', normalize(comment.text),
+            comment.news_id)
+
+
+def index_news(news, using='default'):
+    _write(using, [news_row(news)])
+
+
+def index_news_many(news_list, using='default'):
+    _write(using, [news_row(news) for news in news_list])
+
+
+def index_comment(comment, using='default'):
+    if settings.NEWS_SEARCH_COMMENTS:
+        _write(using, [comment_row(comment)])
+
+
+def remove_news(pk, using='default'):
+    _remove(using, [news_rowid(pk)])
+
+
+def remove_comments(pks, using='default'):
+    _remove(using, [comment_rowid(pk) for pk in pks])
+
+
+def rebuild(using='default', chunk_size=1000):
+    """Переиндексирует все новости и комментарии пачками."""
+    if not fts_available(using):
+        return 0
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    indexed = 0
+    sources = [(News.objects.using(using), news_row)]
+    if settings.NEWS_SEARCH_COMMENTS:
+        sources.append((Comment.objects.using(using), comment_row))
+    for queryset, make_row in sources:
+        rows = []
+        for obj in queryset.order_by().iterator(chunk_size=chunk_size):
+            rows.append(make_row(obj))
+            if len(rows) == chunk_size:
+                _write(using, rows)
+                indexed += len(rows)
+                rows = []
+        _write(using, rows)
+        indexed += len(rows)
+    return indexed
+
+
+def highlight(text, stems, limit=None):
+    """
+    Выделяет в тексте слова, основы которых начинаются с искомых.
+
+    С limit возвращает отрывок из limit слов вокруг первого совпадения.
+    """
+    tokens = WORD.split(text)
+    matches = [
+        index for index in range(1, len(tokens), 2)
+        if any(stem_words(tokens[index])[0].startswith(stem)
+               for stem in stems)
+    ]
+    start, end, prefix, suffix = 0, len(tokens), '', ''
+    if limit:
+        first = matches[0] if matches else 1
+        start = max(0, first - limit // 2 * 2)
+        end = start + limit * 2
+        prefix = '… ' if start else ''
+        suffix = ' …' if end < len(tokens) else ''
+    marked = set(matches)
+    parts = [
+        format_html('<mark>{}</mark>', tokens[index]) if index in marked
+        else escape(tokens[index])
+        for index in range(start, min(end, len(tokens)))
+    ]
+    return mark_safe(prefix + ''.join(parts) + suffix)
+
+
+class SearchResults:
+    """
+    Ленивый результат поиска для Paginator.
+
+    Новости идут по убыванию релевантности; совпадение в заголовке весит
+    больше, чем в тексте, а совпадение в комментарии поднимает новость,
+    к которой он оставлен. У каждой новости заполнены highlighted_title и
+    snippet с выделенными словами.
+    """
+
+    def __init__(self, query, using='default'):
+        self.stems = stem_words(query)
+        self.using = using
+        self.fts = fts_available(using)
+        self.match = ' '.join(f'"{stem}"*' for stem in self.stems)
+        self._count = None
+
+    def _where(self):
+        where = f'{FTS_TABLE} MATCH %s'
+        if not settings.NEWS_SEARCH_COMMENTS:
+            where += ' AND rowid %% 2 = 0'
+        return where
+
+    def _fallback(self):
+        condition = Q()
+        for stem in self.stems:
+            condition &= Q(title__icontains=stem) | Q(text__icontains=stem)
+        return News.objects.using(self.using).filter(condition)
+
+    def count(self):
+        if self._count is None:
+            if not self.stems:
+                self._count = 0
+            elif not self.fts:
+                self._count = self._fallback().count()
+            else:
+                with connections[self.using].cursor() as cursor:
+                    cursor.execute(
+                        f'SELECT COUNT(DISTINCT news_id) FROM {FTS_TABLE} '
+                        f'WHERE {self._where()}',
+                        [self.match],
+                    )
+                    self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        offset = item.start or 0
+        limit = (item.stop or self.count()) - offset
+        if not self.stems or limit <= 0:
+            return []
+        if not self.fts:
+            results = list(self._fallback()[offset:offset + limit])
+        else:
+            with connections[self.using].cursor() as cursor:
+                cursor.execute(
+                    'SELECT news_id, MIN(rank) AS best '
+                    f'FROM (SELECT news_id, rank FROM {FTS_TABLE} '
+                    f'WHERE {self._where()}) '
+                    'GROUP BY news_id ORDER BY best LIMIT %s OFFSET %s',
+                    [self.match, limit, offset],
+                )
+                ids = [row[0] for row in cursor.fetchall()]
+            news = News.objects.using(self.using).in_bulk(ids)
+            results = [news[pk] for pk in ids if pk in news]
+        for news in results:
+            news.highlighted_title = highlight(news.title, self.stems)
+            news.snippet = highlight(news.text, self.stems, SNIPPET_WORDS)
+        return results
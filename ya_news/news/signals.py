@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import cache, profanity, search
+from .models import BadWord, Comment, News
+
+
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_news_cache(**kwargs):
+    """
+    Любая запись новостей или комментариев сбрасывает кеш страниц.
+
+    Повторный сброс после коммита не даёт параллельному запросу закешировать
+    страницу, собранную до завершения транзакции.
+    """
+    cache.invalidate()
+    transaction.on_commit(cache.invalidate)
+
+
+@receiver(post_save, sender=BadWord)
+@receiver(post_delete, sender=BadWord)
+def invalidate_bad_words(**kwargs):
+    """Изменение словаря пересобирает автомат во всех процессах."""
+    profanity.invalidate()
+    transaction.on_commit(profanity.invalidate)
+
+
+@receiver(post_save, sender=News)
+def index_news(instance, using, **kwargs):
+    search.index_news(instance, using)
+
+
+@receiver(post_delete, sender=News)
+def remove_news_from_index(instance, using, **kwargs):
+    search.remove_news(instance.pk, using)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(instance, using, **kwargs):
+    search.index_comment(instance, using)
+
+
+@receiver(post_delete, sender=Comment)
+def remove_comment_from_index(instance, using, **kwargs):
+    search.remove_comments([instance.pk], using)
+
+
+@receiver(connection_created)
+def configure_sqlite(connection, **kwargs):
+    """Выставляет новому соединению SQLite прагмы из настроек."""
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
@@ -1,11 +1,33 @@
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.contrib.auth.mixins import LoginRequiredMixin
-from django.shortcuts import get_object_or_404
+from django.contrib.auth.mixins import (
+    LoginRequiredMixin, PermissionRequiredMixin
+)
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import aget_object_or_404, render
 from django.urls import reverse
 from django.views import generic
+from django.views.decorators.http import condition
 
-from .forms import CommentForm
+from . import cache
+from .forms import CommentForm, CommentModerationForm
+from .instrumentation import measure_render
+from .moderation import delete_comments
 from .models import Comment, News
+from .pagination import KeysetPaginator
+from .ratelimit import RateLimitMixin
+from .search import SearchResults
+
+# Условный GET для страниц новостей: при неизменных данных ответ 304
+# отдаётся до обращения к базе и отрисовки шаблона.
+conditional_page = condition(
+    etag_func=cache.page_etag,
+    last_modified_func=cache.page_last_modified,
+)
 
 
 class NewsList(generic.ListView):
@@ -19,35 +41,144 @@ class NewsList(generic.ListView):
 
         Их количество определяется в настройках проекта.
         """
-        return self.model.objects.prefetch_related(
-            'comment_set'
-        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        return self.model.objects.all()[:settings.NEWS_COUNT_ON_HOME_PAGE]
 
+    def get(self, request, *args, **kwargs):
+        """
+        Анонимам отдаём страницу целиком из кеша.
 
-class NewsDetail(generic.DetailView):
+        Авторизованным шапка страницы своя, поэтому для них кешируется
+        только фрагмент со списком новостей (см. шаблон).
+        """
+        if request.user.is_authenticated:
+            return super().get(request, *args, **kwargs)
+        page_cache = cache.get_cache()
+        key = cache.home_page_key()
+        content = page_cache.get(key)
+        if content is not None:
+            cache.record(cache.HIT)
+            return HttpResponse(content)
+        cache.record(cache.MISS)
+        response = super().get(request, *args, **kwargs)
+        response.add_post_render_callback(
+            lambda response: page_cache.set(
+                key, response.content, settings.NEWS_HOME_CACHE_TIMEOUT
+            )
+        )
+        return response
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['cache_timeout'] = settings.NEWS_HOME_CACHE_TIMEOUT
+        context['cache_version'] = cache.get_version()
+        return context
+
+
+class NewsArchive(generic.ListView):
+    """Архив новостей с постраничным выводом по курсору."""
     model = News
-    template_name = 'news/detail.html'
+    template_name = 'news/archive.html'
+    ordering = ('-date', '-pk')
 
-    def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
-            pk=self.kwargs['pk']
+    def get_queryset(self):
+        paginator = KeysetPaginator(
+            super().get_queryset(),
+            self.ordering,
+            settings.NEWS_COUNT_ON_ARCHIVE_PAGE,
         )
-        return obj
+        self.page = paginator.get_page(self.request.GET.get('cursor'))
+        return self.page.object_list
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context['next_cursor'] = self.page.next_cursor
+        return context
+
+
+class CommentRow(namedtuple(
+    'CommentRow', ('id', 'created', 'text', 'author_id', 'author_username')
+)):
+    """
+    Комментарий в ленте под новостью.
+
+    Шаблону нужны только эти поля, а экземпляры Comment и User на длинных
+    обсуждениях обходятся заметно дороже кортежа.
+    """
+
+    __slots__ = ()
+
+    @property
+    def pk(self):
+        return self.id
+
+
+def get_comments_paginator(news_id):
+    """Комментарии к новости, от старых к новым."""
+    return KeysetPaginator(
+        Comment.objects.filter(news_id=news_id).values_list(
+            'id', 'created', 'text', 'author_id', 'author__username'
+        ),
+        ('created', 'pk'),
+        settings.COMMENTS_COUNT_ON_PAGE,
+        row_factory=CommentRow._make,
+    )
+
+
+def get_comments_page(news_id, cursor=None):
+    """Страница комментариев к новости."""
+    return get_comments_paginator(news_id).get_page(cursor)
+
+
+class NewsSearch(generic.ListView):
+    """Поиск по новостям и комментариям к ним."""
+    template_name = 'news/search.html'
+
+    def get_queryset(self):
+        return SearchResults(self.request.GET.get('q', ''))
+
+    def get_paginate_by(self, queryset):
+        """Настройка читается на запрос, чтобы её можно было переопределить."""
+        return settings.NEWS_COUNT_ON_SEARCH_PAGE
+
+
+class NewsDetail(generic.DetailView):
+    model = News
+    template_name = 'news/detail.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page = get_comments_page(self.object.pk)
+        context['comments'] = page.object_list
+        context['next_cursor'] = page.next_cursor
         if self.request.user.is_authenticated:
             context['form'] = CommentForm()
         return context
 
 
+class NewsCommentsPage(generic.TemplateView):
+    """Следующая страница комментариев без обвязки страницы новости."""
+    template_name = 'news/includes/comments.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page = get_comments_page(
+            self.kwargs['pk'], self.request.GET.get('cursor')
+        )
+        context['comments'] = page.object_list
+        context['next_cursor'] = page.next_cursor
+        context['news_id'] = self.kwargs['pk']
+        return context
+
+
 class NewsComment(
         LoginRequiredMixin,
+        RateLimitMixin,
         generic.detail.SingleObjectMixin,
         generic.FormView
 ):
     model = News
+    ratelimit_scope = 'comment'
+    ratelimit_rate = '10/m'
     form_class = CommentForm
     template_name = 'news/detail.html'
 
@@ -59,12 +190,17 @@ class NewsComment(
         comment = form.save(commit=False)
         comment.news = self.object
         comment.author = self.request.user
-        comment.save()
+        with transaction.atomic():
+            comment.save()
+            News.objects.filter(pk=self.object.pk).update(
+                comment_count=F('comment_count') + 1
+            )
         return super().form_valid(form)
 
     def get_success_url(self):
-        post = self.get_object()
-        return reverse('news:detail', kwargs={'pk': post.pk}) + '#comments'
+        return reverse(
+            'news:detail', kwargs={'pk': self.object.pk}
+        ) + '#comments'
 
 
 class NewsDetailView(generic.View):
@@ -78,19 +214,110 @@ class NewsDetailView(generic.View):
         return view(request, *args, **kwargs)
 
 
+class AsyncViewMixin:
+    """
+    Общее для асинхронных представлений чтения новостей.
+
+    Данные выбираются асинхронным ORM, а шаблон отрисовывается в потоке:
+    у шаблонизатора Django нет асинхронного API, и теги вроде cache и
+    csrf_token синхронные.
+    """
+    template_name = None
+
+    async def get_user(self):
+        """
+        Загружает пользователя асинхронно и подменяет request.user.
+
+        Иначе ленивый request.user повторно и синхронно сходит в базу при
+        отрисовке шапки.
+        """
+        self.request.user = await self.request.auser()
+        return self.request.user
+
+    async def render(self, context):
+        context['view'] = self
+        with measure_render(self.request):
+            return await sync_to_async(render)(
+                self.request, self.template_name, context
+            )
+
+
+class AsyncNewsList(AsyncViewMixin, generic.View):
+    """Асинхронный вариант NewsList для запуска под ASGI."""
+    template_name = NewsList.template_name
+
+    async def get(self, request, *args, **kwargs):
+        user = await self.get_user()
+        version = await cache.aget_version()
+        if not user.is_authenticated:
+            page_cache = cache.get_cache()
+            key = cache.home_page_key(version)
+            content = await page_cache.aget(key)
+            if content is not None:
+                await cache.arecord(cache.HIT)
+                return HttpResponse(content)
+            await cache.arecord(cache.MISS)
+        queryset = News.objects.all()[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        object_list = [news async for news in queryset.aiterator()]
+        response = await self.render({
+            'object_list': object_list,
+            'news_list': object_list,
+            'cache_timeout': settings.NEWS_HOME_CACHE_TIMEOUT,
+            'cache_version': version,
+        })
+        if not user.is_authenticated:
+            await page_cache.aset(
+                key, response.content, settings.NEWS_HOME_CACHE_TIMEOUT
+            )
+        return response
+
+
+class AsyncNewsDetail(AsyncViewMixin, generic.View):
+    """Асинхронный вариант NewsDetail для запуска под ASGI."""
+    template_name = NewsDetail.template_name
+
+    async def get(self, request, *args, **kwargs):
+        user = await self.get_user()
+        news = await aget_object_or_404(News, pk=kwargs['pk'])
+        page = await get_comments_paginator(news.pk).aget_page()
+        context = {
+            'object': news,
+            'news': news,
+            'comments': page.object_list,
+            'next_cursor': page.next_cursor,
+        }
+        if user.is_authenticated:
+            context['form'] = CommentForm()
+        return await self.render(context)
+
+
+class AsyncNewsDetailView(generic.View):
+    """Страница новости под ASGI: чтение асинхронное, комментарий — нет."""
+
+    async def get(self, request, *args, **kwargs):
+        view = AsyncNewsDetail.as_view()
+        return await view(request, *args, **kwargs)
+
+    async def post(self, request, *args, **kwargs):
+        view = sync_to_async(NewsComment.as_view())
+        return await view(request, *args, **kwargs)
+
+
 class CommentBase(LoginRequiredMixin):
     """Базовый класс для работы с комментариями."""
     model = Comment
 
     def get_success_url(self):
-        comment = self.get_object()
+        """Объект уже загружен, а для адреса хватает news_id."""
         return reverse(
-            'news:detail', kwargs={'pk': comment.news.pk}
+            'news:detail', kwargs={'pk': self.object.news_id}
         ) + '#comments'
 
     def get_queryset(self):
         """Пользователь может работать только со своими комментариями."""
-        return self.model.objects.filter(author=self.request.user)
+        return self.model.objects.filter(
+            author=self.request.user
+        ).select_related('news')
 
 
 class CommentUpdate(CommentBase, generic.UpdateView):
@@ -102,3 +329,42 @@ class CommentUpdate(CommentBase, generic.UpdateView):
 class CommentDelete(CommentBase, generic.DeleteView):
     """Удаление комментария."""
     template_name = 'news/delete.html'
+
+    def form_valid(self, form):
+        with transaction.atomic():
+            response = super().form_valid(form)
+            self.decrease_comment_count()
+        return response
+
+    def delete(self, request, *args, **kwargs):
+        with transaction.atomic():
+            response = super().delete(request, *args, **kwargs)
+            self.decrease_comment_count()
+        return response
+
+    def decrease_comment_count(self):
+        """
+        Пересчитывает счётчик комментариев у новости удалённого комментария.
+
+        Пересчёт, а не вычитание единицы: счётчик мог разойтись с данными
+        (загрузка фикстур, вставки из shell), и уход ниже нуля нарушил бы
+        ограничение поля. Это тот же один запрос UPDATE.
+        """
+        News.objects.filter(
+            pk=self.object.news_id
+        ).update_comment_count()
+
+
+class CommentBulkDelete(PermissionRequiredMixin, generic.FormView):
+    """Массовое удаление комментариев модератором."""
+    form_class = CommentModerationForm
+    permission_required = 'news.delete_comment'
+    raise_exception = True
+    http_method_names = ['post']
+
+    def form_valid(self, form):
+        deleted = delete_comments(form.get_queryset())
+        return JsonResponse({'deleted': deleted})
+
+    def form_invalid(self, form):
+        return JsonResponse({'errors': form.errors}, status=400)
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -22,10 +23,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'news.instrumentation.InstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'news.routers.PrimaryPinningMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -54,10 +57,110 @@ WSGI_APPLICATION = 'yanews.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.getenv('DJANGO_SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
     }
 }
 
+# Прагмы SQLite, которые выставляются каждому новому соединению.
+SQLITE_PRAGMAS = {}
+
+# production: постоянные соединения с проверкой перед запросом. Если задан
+# POSTGRES_DB — PostgreSQL с пулом соединений (нужен psycopg[pool]), иначе
+# SQLite в режиме WAL: читатели не ждут писателя, а писатели ждут друг
+# друга busy_timeout, а не падают с «database is locked».
+DATABASE_PROFILE = os.getenv('DJANGO_DB_PROFILE', 'development')
+
+if DATABASE_PROFILE == 'production' and os.getenv('POSTGRES_DB'):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.getenv('POSTGRES_DB'),
+        'USER': os.getenv('POSTGRES_USER', 'postgres'),
+        'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+        'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
+        'PORT': os.getenv('POSTGRES_PORT', '5432'),
+        # Соединения держит пул, постоянные соединения Django с ним
+        # несовместимы.
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pool': {
+                'min_size': 2,
+                'max_size': int(os.getenv('POSTGRES_POOL_SIZE', 10)),
+            },
+        },
+    }
+elif DATABASE_PROFILE == 'production':
+    DATABASES['default'].update(
+        CONN_MAX_AGE=int(os.getenv('DJANGO_CONN_MAX_AGE', 600)),
+        CONN_HEALTH_CHECKS=True,
+        OPTIONS={'transaction_mode': 'IMMEDIATE', 'timeout': 20},
+    )
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 20000,
+    }
+
+# Файл тестовой базы SQLite. По умолчанию тесты идут в памяти; run_tests.sh
+# в параллельном режиме задаёт путь с хешем миграций, и pytest --reuse-db
+# переиспользует базу, пока миграции не менялись.
+if (
+    os.getenv('DJANGO_TEST_SQLITE_PATH')
+    and DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3'
+):
+    DATABASES['default']['TEST'] = {
+        'NAME': os.getenv('DJANGO_TEST_SQLITE_PATH'),
+    }
+
+# Реплики для чтения новостей: NAME каждой через запятую в
+# NEWS_READ_REPLICAS (для SQLite — пути к копиям файла базы). В тестах
+# реплики смотрят в тестовую основную базу.
+NEWS_READ_REPLICAS = []
+for index, name in enumerate(
+    filter(None, os.getenv('NEWS_READ_REPLICAS', '').split(','))
+):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
+    }
+    NEWS_READ_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['news.routers.ReplicaRouter']
+
+# Сколько секунд после записи пользователь читает из основной базы.
+NEWS_REPLICA_LAG = int(os.getenv('NEWS_REPLICA_LAG', 5))
+
+
+# Бэкенд кеша выбирается окружением: по умолчанию locmem, для нескольких
+# процессов — django.core.cache.backends.filebased.FileBasedCache
+# (LOCATION — каталог) или django.core.cache.backends.redis.RedisCache
+# (LOCATION — redis://host:port). Сброс кеша новостей меняет версию только
+# в этом бэкенде, поэтому при нескольких процессах с locmem каждый из них
+# отдаёт свою закешированную главную до истечения её срока.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'NEWS_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.getenv('NEWS_CACHE_LOCATION', 'yanews'),
+    }
+}
+
+# Сколько секунд живут в кеше версия данных новостей и время их изменения,
+# из которых складываются ETag и Last-Modified. В locmem у каждого процесса
+# своя копия: сброс в одном процессе другие заметят, лишь когда их ключи
+# истекут, и до тех пор могут отвечать 304 на устаревшую страницу. Общему
+# бэкенду срок не нужен: сброс виден всем процессам сразу.
+NEWS_CACHE_VALIDATOR_TIMEOUT = (
+    int(os.environ['NEWS_CACHE_VALIDATOR_TIMEOUT'])
+    if 'NEWS_CACHE_VALIDATOR_TIMEOUT' in os.environ
+    else 60 if CACHES['default']['BACKEND'].endswith('.LocMemCache')
+    else None
+)
+
 
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -80,3 +183,36 @@ LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('news:home')
 
 NEWS_COUNT_ON_HOME_PAGE = 10
+NEWS_COUNT_ON_ARCHIVE_PAGE = 20
+NEWS_COUNT_ON_SEARCH_PAGE = 10
+NEWS_SEARCH_COMMENTS = True
+COMMENTS_COUNT_ON_PAGE = 50
+COMMENTS_MODERATION_CHUNK_SIZE = 500
+
+# Асинхронные представления главной и страницы новости. Включаются в
+# yanews/asgi.py: под WSGI они лишь добавили бы цикл событий на запрос.
+NEWS_ASYNC_VIEWS = os.getenv('NEWS_ASYNC_VIEWS') == '1'
+
+NEWS_CACHE_ALIAS = 'default'
+NEWS_HOME_CACHE_TIMEOUT = int(os.getenv('NEWS_HOME_CACHE_TIMEOUT', 60))
+
+# Частота записи по областям представлений: «запросов/период», период —
+# s, m, h или d с необязательным множителем («100/5m»); None снимает лимит.
+# NEWS_RATELIMIT_ENABLED=0 отключает ограничение целиком, например, для
+# нагрузочных замеров.
+NEWS_RATELIMIT_ENABLED = os.getenv('NEWS_RATELIMIT_ENABLED', '1') == '1'
+NEWS_RATELIMITS = {}
+
+# Доля запросов к news, для которых считаются запросы к базе и время
+# ответа (заголовок Server-Timing, лог news.instrumentation, агрегаты
+# в кеше — см. manage.py request_metrics).
+NEWS_INSTRUMENTATION_SAMPLE_RATE = float(
+    os.getenv('NEWS_INSTRUMENTATION_SAMPLE_RATE', 0.05)
+)
+
+# Файл со словарём запрещённых слов: по слову в строке, # — комментарий.
+NEWS_BAD_WORDS_FILE = os.getenv('NEWS_BAD_WORDS_FILE')
+# Как часто, в секундах, проверять, не изменился ли этот файл.
+NEWS_BAD_WORDS_FILE_CHECK_INTERVAL = int(
+    os.getenv('NEWS_BAD_WORDS_FILE_CHECK_INTERVAL', 5)
+)
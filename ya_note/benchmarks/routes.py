@@ -0,0 +1,264 @@
+"""
+Нагрузочный прогон всех маршрутов notes и users на наполненной базе.
+
+База SQLite создаётся во временном каталоге: обычные пользователи с
+несколькими заметками и «тяжёлые» владельцы с тысячами. Затем каждый
+маршрут запрашивается через тестовый клиент Django от имени тяжёлого
+владельца; для него замеряются пропускная способность, задержки
+p50/p95/p99 и число запросов к базе на ответ. Результаты пишутся в JSON
+вместе с коммитом, чтобы сравнивать прогоны между собой.
+
+Запуск из каталога ya_note: python -m benchmarks.routes
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+PASSWORD = 'benchmark-password'
+
+
+def seed(users_count, notes_per_user, heavy_owners, notes_per_owner):
+    """Наполняет базу и возвращает тяжёлых владельцев заметок."""
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+
+    from notes.models import Note
+
+    password = make_password(PASSWORD)
+    users = get_user_model().objects.bulk_create(
+        get_user_model()(username=f'user-{index}', password=password)
+        for index in range(users_count + heavy_owners)
+    )
+    owners = users[:heavy_owners]
+    Note.objects.bulk_create(
+        (
+            Note(
+                author=user,
+                title=f'Заметка {index} о планах и покупках',
+                text=f'Текст заметки {index}: список дел на неделю.',
+                slug=f'{user.username}-{index}',
+            )
+            for user in users
+            for index in range(
+                notes_per_owner if user in owners else notes_per_user
+            )
+        ),
+        batch_size=1000,
+    )
+    return owners
+
+
+def routes(owners, clients):
+    """
+    Сценарии: имя маршрута, клиент, метод и функция, возвращающая адрес и
+    данные для очередного запроса.
+    """
+    from django.conf import settings
+    from django.urls import reverse
+
+    from notes.models import Note
+
+    owner = owners[0]
+    own = Note.objects.filter(author=owner).order_by('pk')
+    slug = own.values_list('slug', flat=True)[0]
+    delete_slugs = iter(own.values_list('slug', flat=True)[1:])
+    created = iter(range(10 ** 9))
+    last_page = -(-own.count() // settings.NOTES_COUNT_ON_PAGE)
+
+    def fixed(url, data=None):
+        return lambda: (url, data)
+
+    def add():
+        index = next(created)
+        return reverse('notes:add'), {
+            'title': f'Новая заметка {index}',
+            'text': 'Текст новой заметки.',
+        }
+
+    def logout():
+        clients['owner'].force_login(owner)
+        return reverse('users:logout'), None
+
+    return [
+        ('notes:home', 'anonymous', 'get', fixed(reverse('notes:home'))),
+        ('notes:home', 'owner', 'get', fixed(reverse('notes:home'))),
+        ('notes:list', 'owner', 'get', fixed(reverse('notes:list'))),
+        ('notes:list', 'owner', 'get',
+         fixed(reverse('notes:list'), {'page': last_page})),
+        ('notes:list', 'owner', 'get',
+         fixed(reverse('notes:list'), {'q': 'покупках'})),
+        ('notes:search', 'owner', 'get',
+         fixed(reverse('notes:search'), {'q': 'покупки'})),
+        ('notes:detail', 'owner', 'get',
+         fixed(reverse('notes:detail', args=(slug,)))),
+        ('notes:add', 'owner', 'get', fixed(reverse('notes:add'))),
+        ('notes:add', 'owner', 'post', add),
+        ('notes:edit', 'owner', 'get',
+         fixed(reverse('notes:edit', args=(slug,)))),
+        ('notes:edit', 'owner', 'post',
+         fixed(reverse('notes:edit', args=(slug,)),
+               {'title': 'Правка', 'text': 'Новый текст', 'slug': slug})),
+        ('notes:delete', 'owner', 'get',
+         fixed(reverse('notes:delete', args=(slug,)))),
+        ('notes:delete', 'owner', 'post',
+         lambda: (reverse('notes:delete', args=(next(delete_slugs),)),
+                  None)),
+        ('notes:success', 'owner', 'get', fixed(reverse('notes:success'))),
+        ('notes:export', 'owner', 'get',
+         fixed(reverse('notes:export'), {'format': 'ndjson'})),
+        ('notes:export', 'owner', 'get',
+         fixed(reverse('notes:export'), {'format': 'zip'})),
+        ('users:login', 'anonymous', 'get', fixed(reverse('users:login'))),
+        ('users:login', 'guest', 'post',
+         fixed(reverse('users:login'),
+               {'username': owner.username, 'password': PASSWORD})),
+        ('users:signup', 'anonymous', 'get', fixed(reverse('users:signup'))),
+        ('users:logout', 'owner', 'post', logout),
+    ]
+
+
+def percentile(values, share):
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def measure(client, method, next_request, requests):
+    """
+    Прогоняет сценарий и возвращает сводку замеров.
+
+    Подготовка очередного запроса в замеры не входит.
+    """
+    from django.db import connection
+
+    from notes.instrumentation import QueryRecorder
+
+    latencies = []
+    errors = 0
+    query = None
+    recorder = QueryRecorder()
+    elapsed = 0.0
+    for _ in range(requests):
+        try:
+            url, data = next_request()
+        except StopIteration:
+            break
+        if method == 'get' and not latencies:
+            query = data
+        started = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = getattr(client, method)(url, data)
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+        latencies.append(time.perf_counter() - started)
+        elapsed += latencies[-1]
+        errors += response.status_code >= 400
+    latencies.sort()
+    return {
+        'query': query,
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'queries_per_request': round(recorder.count / len(latencies), 2),
+    }
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            check=True, capture_output=True, text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(args):
+    import django
+
+    django.setup()
+    from django.core.management import call_command
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    call_command('migrate', verbosity=0)
+    owners = seed(
+        args.users, args.notes, args.heavy_owners, args.notes_per_owner
+    )
+    clients = {'anonymous': Client(), 'guest': Client(), 'owner': Client()}
+    clients['owner'].force_login(owners[0])
+    results = []
+    for name, client_name, method, next_request in routes(owners, clients):
+        result = measure(
+            clients[client_name], method, next_request, args.requests
+        )
+        results.append(
+            {'route': name, 'client': client_name, 'method': method,
+             **result}
+        )
+        query = '&'.join(f'{key}={value}' for key, value in (
+            result['query'] or {}
+        ).items())
+        print(f'{name:18} {client_name:9} {method:4} {query:14} '
+              f'{result["rps"]:8.1f} запросов/с  '
+              f'p50 {result["p50_ms"]:7.2f}  p95 {result["p95_ms"]:7.2f}  '
+              f'p99 {result["p99_ms"]:7.2f} мс  '
+              f'запросов к базе: {result["queries_per_request"]:5.1f}  '
+              f'ошибок: {result["errors"]}')
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--notes', type=int, default=10,
+                        help='Заметок у обычного пользователя.')
+    parser.add_argument('--heavy-owners', type=int, default=2)
+    parser.add_argument('--notes-per-owner', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=200,
+                        help='Запросов на каждый маршрут.')
+    parser.add_argument('--output', type=Path,
+                        help='Файл JSON; по умолчанию '
+                             '.benchmarks/routes-<коммит>.json.')
+    args = parser.parse_args()
+    revision = commit()
+    output = args.output or Path('.benchmarks') / f'routes-{revision}.json'
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ.update(
+            DJANGO_SETTINGS_MODULE='yanote.settings',
+            DJANGO_SQLITE_PATH=str(Path(directory) / 'db.sqlite3'),
+            NOTES_RATELIMIT_ENABLED='0',
+            NOTES_INSTRUMENTATION_SAMPLE_RATE='0',
+        )
+        results = run(args)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        'project': 'ya_note',
+        'commit': revision,
+        'created': datetime.now(timezone.utc).isoformat(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'params': {
+            'users': args.users,
+            'notes_per_user': args.notes,
+            'heavy_owners': args.heavy_owners,
+            'notes_per_owner': args.notes_per_owner,
+            'requests_per_route': args.requests,
+        },
+        'routes': results,
+    }, ensure_ascii=False, indent=2))
+    print(f'Результаты: {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Сравнение транслитерации заголовков с кешем и без него.
+
+Запуск из каталога ya_note: python -m benchmarks.slugify
+"""
+import random
+import timeit
+
+from pytils.translit import slugify as translit_slugify
+
+from notes.slugs import slugify, slugify_many
+
+SUBJECTS = (
+    'Список покупок', 'Планы на неделю', 'Идеи для проекта', 'Встреча',
+    'Конспект лекции', 'Рецепт борща', 'Книги к прочтению', 'Отпуск',
+    'Заметки по Django', 'Тренировка', 'Ремонт квартиры', 'Дни рождения',
+)
+DETAILS = (
+    '', ' на понедельник', ' на выходные', ' — черновик', ' (важно)',
+    ' для команды', ' по работе', ' на завтра',
+)
+TITLES_COUNT = 20000
+
+
+def make_titles(count, seed=0):
+    """Заголовки с повторами, как в реальном импорте заметок."""
+    rng = random.Random(seed)
+    return [
+        rng.choice(SUBJECTS) + rng.choice(DETAILS) for _ in range(count)
+    ]
+
+
+def main():
+    titles = make_titles(TITLES_COUNT)
+    plain = min(timeit.repeat(
+        lambda: [translit_slugify(title) for title in titles],
+        number=1, repeat=3,
+    ))
+    cached = min(timeit.repeat(
+        lambda: [slugify(title) for title in titles],
+        setup=slugify.cache_clear, number=1, repeat=3,
+    ))
+    batch = min(timeit.repeat(
+        lambda: slugify_many(titles),
+        setup=slugify.cache_clear, number=1, repeat=3,
+    ))
+    print(f'Заголовков: {len(titles)}, уникальных: {len(set(titles))}')
+    print(f'pytils без кеша: {plain * 1000:8.1f} мс')
+    print(f'slugify с кешем: {cached * 1000:8.1f} мс '
+          f'(x{plain / cached:.1f})')
+    print(f'slugify_many:    {batch * 1000:8.1f} мс '
+          f'(x{plain / batch:.1f})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Потоковая выгрузка заметок в NDJSON, CSV и ZIP с Markdown-файлами."""
+import csv
+import json
+import zipfile
+from collections import namedtuple
+
+from django.conf import settings
+
+ExportFormat = namedtuple(
+    'ExportFormat', ('render', 'content_type', 'extension')
+)
+FIELDS = ('id', 'title', 'slug', 'text')
+
+
+class StreamBuffer:
+    """Приёмник для csv и zipfile, отдающий записанное кусками."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(
+            chunk.encode() if isinstance(chunk, str) else chunk
+            for chunk in self.chunks
+        )
+        self.chunks = []
+        return data
+
+
+def iter_notes(queryset):
+    """Заметки без загрузки всей выборки в память."""
+    return queryset.only(*FIELDS).order_by('id').iterator(
+        chunk_size=settings.NOTES_EXPORT_CHUNK_SIZE
+    )
+
+
+def render_ndjson(queryset):
+    for note in iter_notes(queryset):
+        yield json.dumps(
+            {field: getattr(note, field) for field in FIELDS},
+            ensure_ascii=False,
+        ).encode() + b'\n'
+
+
+def render_csv(queryset):
+    buffer = StreamBuffer()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELDS)
+    yield buffer.pop()
+    for note in iter_notes(queryset):
+        writer.writerow([getattr(note, field) for field in FIELDS])
+        yield buffer.pop()
+
+
+def render_zip(queryset):
+    """
+    ZIP-архив с заметкой в Markdown на файл.
+
+    Поток не поддерживает seek, поэтому zipfile пишет размеры в
+    дескрипторы после данных, и архив отдаётся по мере сборки.
+    """
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for note in iter_notes(queryset):
+            archive.writestr(
+                f'{note.slug}.md', f'# {note.title}\n\n{note.text}\n'
+            )
+            yield buffer.pop()
+    yield buffer.pop()
+
+
+FORMATS = {
+    'ndjson': ExportFormat(render_ndjson, 'application/x-ndjson', 'ndjson'),
+    'csv': ExportFormat(render_csv, 'text/csv; charset=utf-8', 'csv'),
+    'zip': ExportFormat(render_zip, 'application/zip', 'zip'),
+}
@@ -1,7 +1,4 @@
-from pytils.translit import slugify
-
 from django import forms
-from django.core.exceptions import ValidationError
 
 from .models import Note
 
@@ -15,15 +12,15 @@ class NoteForm(forms.ModelForm):
         model = Note
         fields = ('title', 'text', 'slug')
 
-    def clean_slug(self):
-        """Обрабатывает случай, если slug не уникален."""
-        cleaned_data = super().clean()
-        slug = cleaned_data.get('slug')
-        if not slug:
-            title = cleaned_data.get('title')
-            slug = slugify(title)[:100]
-        if Note.objects.filter(
-                slug=slug
-        ).exclude(id=self.instance.pk).exists():
-            raise ValidationError(slug + WARNING)
-        return slug
+    def validate_unique(self):
+        """
+        Уникальность slug проверяет индекс при сохранении.
+
+        Пустой slug подберёт модель, занятый slug превратится в ошибку
+        формы в представлении — без лишнего запроса перед вставкой.
+        Других уникальных полей у заметки нет.
+        """
+
+    def add_slug_error(self):
+        """Сообщает, что введённый slug уже занят."""
+        self.add_error('slug', self.cleaned_data['slug'] + WARNING)
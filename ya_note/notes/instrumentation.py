@@ -0,0 +1,205 @@
+"""Замеры запросов к базе и времени ответа для части запросов."""
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import (
+    iscoroutinefunction, markcoroutinefunction, sync_to_async
+)
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY = 'metrics:{view}:{field}'
+FIELDS = (
+    'requests', 'queries', 'duplicates', 'db_us', 'render_us', 'total_us'
+)
+# Со скольких одинаковых запросов подозреваем N+1.
+N_PLUS_ONE_THRESHOLD = 3
+
+
+class QueryRecorder:
+    """Обёртка execute_wrapper: считает запросы, их время и повторы."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        return self.count - len(self.statements)
+
+    def repeated(self):
+        """Запросы, повторённые не меньше N_PLUS_ONE_THRESHOLD раз."""
+        return {
+            sql: count for sql, count in self.statements.items()
+            if count >= N_PLUS_ONE_THRESHOLD
+        }
+
+
+class Measurement:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = QueryRecorder()
+        self.render = 0.0
+
+    def start_render(self, response):
+        started = time.perf_counter()
+
+        def finish(response):
+            self.render = time.perf_counter() - started
+
+        response.add_post_render_callback(finish)
+        return response
+
+    def finish(self, request, response, app_names):
+        """Дописывает Server-Timing, пишет лог и копит агрегаты по view."""
+        match = request.resolver_match
+        if match is None or match.app_name not in app_names:
+            return response
+        total = time.perf_counter() - self.started
+        queries = self.queries
+        response.headers['Server-Timing'] = ', '.join((
+            f'db;dur={queries.duration * 1000:.2f};'
+            f'desc="{queries.count} queries"',
+            f'dup;desc="{queries.duplicates} duplicate queries"',
+            f'render;dur={self.render * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ))
+        metrics = {
+            'view': match.view_name,
+            'method': request.method,
+            'status': response.status_code,
+            'queries': queries.count,
+            'duplicates': queries.duplicates,
+            'db_ms': round(queries.duration * 1000, 2),
+            'render_ms': round(self.render * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+        }
+        logger.info(json.dumps(metrics, ensure_ascii=False))
+        repeated = queries.repeated()
+        if repeated:
+            logger.warning(json.dumps(
+                {'view': match.view_name, 'repeated': repeated},
+                ensure_ascii=False,
+            ))
+        record(match.view_name, {
+            'requests': 1,
+            'queries': queries.count,
+            'duplicates': queries.duplicates,
+            'db_us': round(queries.duration * 1e6),
+            'render_us': round(self.render * 1e6),
+            'total_us': round(total * 1e6),
+        })
+        return response
+
+
+def wrap_connections(wrapper):
+    """
+    Ставит обёртку на соединения со всеми базами из DATABASES.
+
+    Какие базы затронет запрос, заранее не известно: роутер может увести
+    чтение на реплику. Соединения создаются лениво, так что обёртка на
+    неиспользованной базе ничего не стоит. Снимается закрытием
+    возвращённого ExitStack в том же потоке.
+    """
+    wrappers = ExitStack()
+    for alias in connections:
+        wrappers.enter_context(connections[alias].execute_wrapper(wrapper))
+    return wrappers
+
+
+def record(view, values):
+    """Прибавляет значения к агрегатам представления в кеше."""
+    for field, value in values.items():
+        key = METRICS_KEY.format(view=view, field=field)
+        try:
+            cache.incr(key, value)
+        except ValueError:
+            cache.add(key, 0, timeout=None)
+            cache.incr(key, value)
+
+
+def get_metrics(views):
+    """Возвращает накопленные агрегаты по именам представлений."""
+    keys = {
+        METRICS_KEY.format(view=view, field=field): (view, field)
+        for view in views for field in FIELDS
+    }
+    values = cache.get_many(keys)
+    metrics = {view: dict.fromkeys(FIELDS, 0) for view in views}
+    for key, (view, field) in keys.items():
+        metrics[view][field] = values.get(key, 0)
+    return metrics
+
+
+class InstrumentationMiddleware:
+    """
+    Замеряет долю запросов, заданную NOTES_INSTRUMENTATION_SAMPLE_RATE.
+
+    Остальные запросы проходят без обёрток, так что при малой доле
+    middleware можно держать включённым в боевом окружении.
+    """
+
+    app_names = {'notes'}
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled(request):
+            return self.get_response(request)
+        measurement = request.instrumentation = Measurement()
+        with wrap_connections(measurement.queries):
+            response = self.get_response(request)
+        return measurement.finish(request, response, self.app_names)
+
+    async def __acall__(self, request):
+        """
+        Асинхронный ORM ходит в базу из потока sync_to_async, у которого
+        свои соединения, поэтому обёртки ставятся в этом потоке.
+        """
+        if not self.sampled(request):
+            return await self.get_response(request)
+        measurement = request.instrumentation = Measurement()
+        wrappers = await sync_to_async(wrap_connections)(
+            measurement.queries
+        )
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(wrappers.close)()
+        return measurement.finish(request, response, self.app_names)
+
+    def sampled(self, request):
+        rate = settings.NOTES_INSTRUMENTATION_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+    def process_template_response(self, request, response):
+        measurement = getattr(request, 'instrumentation', None)
+        if measurement is None:
+            return response
+        return measurement.start_render(response)
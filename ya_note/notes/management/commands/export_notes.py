@@ -0,0 +1,41 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.export import FORMATS
+from notes.models import Note
+
+
+class Command(BaseCommand):
+    help = 'Выгружает все заметки пользователя в NDJSON, CSV или ZIP.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Чьи заметки выгружать.')
+        parser.add_argument(
+            '--format',
+            choices=sorted(FORMATS),
+            default='ndjson',
+            help='Формат выгрузки.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для записи; по умолчанию — stdout.',
+        )
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден.'
+            )
+        chunks = FORMATS[options['format']].render(
+            Note.objects.filter(author=user)
+        )
+        if options['output']:
+            with open(options['output'], 'wb') as file:
+                file.writelines(chunks)
+        else:
+            sys.stdout.buffer.writelines(chunks)
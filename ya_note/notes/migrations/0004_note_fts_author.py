@@ -0,0 +1,81 @@
+from importlib import import_module
+
+from django.db import migrations
+
+FTS_TABLE = 'notes_note_fts'
+
+# Индекс пересоздаётся с колонкой author_id: автор входит в выражение
+# MATCH, и FTS5 пересекает списки вхождений слов со списком заметок
+# автора, не перебирая заметки всех пользователей.
+CREATE_SQL = (
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, text, author_id,
+        content='notes_note', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON notes_note BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, text, author_id)
+        VALUES (new.id, new.title, new.text, new.author_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON notes_note BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text, author_id)
+        VALUES ('delete', old.id, old.title, old.text, old.author_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_au
+    AFTER UPDATE OF title, text, author_id ON notes_note
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text, author_id)
+        VALUES ('delete', old.id, old.title, old.text, old.author_id);
+        INSERT INTO {FTS_TABLE}(rowid, title, text, author_id)
+        VALUES (new.id, new.title, new.text, new.author_id);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+DROP_SQL = (
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+)
+
+
+def has_fts(schema_editor):
+    """Индекс есть, только если его создала миграция 0003."""
+    connection = schema_editor.connection
+    return (
+        connection.vendor == 'sqlite'
+        and FTS_TABLE in connection.introspection.table_names()
+    )
+
+
+def recreate_fts(create_sql):
+    def recreate(apps, schema_editor):
+        if not has_fts(schema_editor):
+            return
+        for sql in (*DROP_SQL, *create_sql):
+            schema_editor.execute(sql)
+    return recreate
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0003_note_fts'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            recreate_fts(CREATE_SQL),
+            recreate_fts(
+                import_module('notes.migrations.0003_note_fts').CREATE_SQL
+            ),
+        ),
+    ]
@@ -1,7 +1,9 @@
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
 
-from pytils.translit import slugify
+from .slugs import allocate_slug, slugify
+
+SLUG_ATTEMPTS = 5
 
 
 class Note(models.Model):
@@ -28,11 +30,33 @@ class Note(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        indexes = (
+            models.Index(fields=('author', 'id'), name='note_author_id_idx'),
+        )
+
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            max_slug_length = self._meta.get_field('slug').max_length
-            self.slug = slugify(self.title)[:max_slug_length]
-        super().save(*args, **kwargs)
+        """
+        Без slug подбираем свободный по заголовку.
+
+        Уникальность проверяет индекс: если slug успел занять параллельный
+        запрос, подбираем следующий.
+        """
+        if self.slug:
+            return super().save(*args, **kwargs)
+        max_slug_length = self._meta.get_field('slug').max_length
+        base = slugify(self.title)
+        for attempt in range(SLUG_ATTEMPTS):
+            self.slug = allocate_slug(
+                Note.objects.all(), base, max_slug_length, exclude_pk=self.pk
+            )
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if attempt == SLUG_ATTEMPTS - 1:
+                    self.slug = ''
+                    raise
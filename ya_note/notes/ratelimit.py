@@ -0,0 +1,105 @@
+"""Ограничение частоты запросов на запись по пользователю или адресу."""
+import math
+import time
+from collections import namedtuple
+from functools import lru_cache
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.cache import cache
+from django.http import HttpResponse
+
+Rate = namedtuple('Rate', ('limit', 'period'))
+
+KEY = 'ratelimit:{scope}:{ident}:{window}'
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+@lru_cache
+def parse_rate(rate):
+    """
+    Разбирает частоту вида «10/m» или «100/5m».
+
+    Лимит меньше единицы не пропустил бы ни одного запроса, а расчёт
+    ожидания делил бы на ноль.
+    """
+    limit, _, period = rate.partition('/')
+    if int(limit) < 1:
+        raise ImproperlyConfigured(
+            f'Лимит в частоте «{rate}» должен быть не меньше 1.'
+        )
+    return Rate(int(limit), int(period[:-1] or 1) * PERIODS[period[-1]])
+
+
+def hit(scope, ident, rate, now=None):
+    """
+    Учитывает запрос и возвращает, сколько секунд ждать, или 0.
+
+    Скользящее окно из двух счётчиков в кеше приближает ведро токенов:
+    прошлое окно учитывается с весом, убывающим по мере хода текущего, так
+    что лимит восстанавливается плавно, без всплеска на границе окон. Для
+    пропущенного запроса нужны одно атомарное incr и одно get; отклонённый
+    возвращает свой токен через decr.
+    """
+    limit, period = parse_rate(rate)
+    window, elapsed = divmod(time.time() if now is None else now, period)
+    key = KEY.format(scope=scope, ident=ident, window=int(window))
+    try:
+        current = cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=2 * period)
+        current = cache.incr(key)
+    previous = cache.get(
+        KEY.format(scope=scope, ident=ident, window=int(window) - 1), 0
+    )
+    if previous * (1 - elapsed / period) + current <= limit:
+        return 0
+    cache.decr(key)
+    accepted = current - 1
+    if accepted < limit and previous:
+        wait = period * (1 - (limit - accepted - 1) / previous) - elapsed
+    else:
+        wait = period - elapsed + period * (1 - (limit - 1) / accepted)
+    return max(1, math.ceil(wait))
+
+
+def get_ident(request):
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{request.META.get("REMOTE_ADDR")}'
+
+
+class RateLimitMixin:
+    """
+    Ограничивает частоту запросов к представлению.
+
+    Частота задаётся атрибутом ratelimit_rate и переопределяется в
+    NOTES_RATELIMITS по ratelimit_scope; None в настройках снимает лимит.
+    """
+
+    ratelimit_scope = None
+    ratelimit_rate = None
+    ratelimit_methods = ('POST',)
+
+    def dispatch(self, request, *args, **kwargs):
+        rate = settings.NOTES_RATELIMITS.get(
+            self.ratelimit_scope, self.ratelimit_rate
+        )
+        if (
+            rate
+            and settings.NOTES_RATELIMIT_ENABLED
+            and request.method in self.ratelimit_methods
+        ):
+            retry_after = hit(self.ratelimit_scope, get_ident(request), rate)
+            if retry_after:
+                return self.ratelimited(retry_after)
+        return super().dispatch(request, *args, **kwargs)
+
+    def ratelimited(self, retry_after):
+        return HttpResponse(
+            'Слишком много запросов, попробуйте позже.',
+            content_type='text/plain; charset=utf-8',
+            status=HTTPStatus.TOO_MANY_REQUESTS,
+            headers={'Retry-After': str(retry_after)},
+        )
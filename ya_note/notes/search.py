@@ -0,0 +1,94 @@
+"""Полнотекстовый поиск по заметкам."""
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'notes_note_fts'
+WORD = re.compile(r'\w+')
+
+_fts_tables = {}
+
+
+def fts_available(using):
+    """Есть ли в базе индекс FTS5 (создаётся миграцией только в SQLite)."""
+    if using not in _fts_tables:
+        connection = connections[using]
+        _fts_tables[using] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_tables[using]
+
+
+def build_match(query):
+    """
+    Превращает ввод пользователя в запрос MATCH.
+
+    Каждое слово берётся в кавычки, чтобы операторы FTS5 из ввода не
+    исполнялись, и ищется по префиксу: «заметк» найдёт «заметки».
+    """
+    return ' '.join(f'"{word}"*' for word in WORD.findall(query.lower()))
+
+
+def scoped_match(match, columns, author_id):
+    """
+    Ограничивает запрос MATCH колонками и, если задан, автором.
+
+    Автор входит в само выражение: FTS5 пересекает вхождения слов с
+    заметками автора вместо обхода вхождений по всем пользователям.
+    """
+    match = f'{{{columns}}} : ({match})'
+    if author_id is None:
+        return match
+    return f'author_id : "{int(author_id)}" AND {match}'
+
+
+def filter_by_title(queryset, query, author_id=None):
+    """
+    Заметки из queryset, в заголовке которых есть слова запроса.
+
+    LIKE в SQLite не учитывает регистр только у латиницы, а заголовки
+    здесь кириллические, поэтому с индексом FTS5 ищем по его колонке
+    title: токенизатор приводит к нижнему регистру любые буквы. Без
+    индекса остаётся icontains, который в PostgreSQL учитывает Unicode.
+    """
+    match = build_match(query)
+    if not match or not fts_available(queryset.db):
+        return queryset.filter(title__icontains=query)
+    return queryset.filter(id__in=RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [scoped_match(match, 'title', author_id)],
+    ))
+
+
+def search_notes(queryset, query, author_id=None, limit=None):
+    """
+    Заметки из queryset, подходящие под запрос, от лучших к худшим.
+
+    С индексом FTS5 порядок задаёт bm25, совпадение в заголовке весит
+    больше, чем в тексте. Без индекса — поиск подстроки по заголовку и
+    тексту, новые заметки выше. author_id сужает сам поиск по индексу
+    до заметок автора.
+    """
+    limit = limit or settings.NOTES_SEARCH_LIMIT
+    match = build_match(query)
+    if not match:
+        return []
+    if not fts_available(queryset.db):
+        return list(
+            queryset.filter(
+                Q(title__icontains=query) | Q(text__icontains=query)
+            ).order_by('-id')[:limit]
+        )
+    notes_query, params = queryset.values('id').query.sql_with_params()
+    return list(queryset.model.objects.raw(
+        f'SELECT notes_note.*, bm25({FTS_TABLE}, 10.0, 1.0, 0.0) AS rank '
+        f'FROM {FTS_TABLE} '
+        f'JOIN notes_note ON notes_note.id = {FTS_TABLE}.rowid '
+        f'WHERE {FTS_TABLE} MATCH %s AND notes_note.id IN ({notes_query}) '
+        f'ORDER BY rank LIMIT %s',
+        [scoped_match(match, 'title text', author_id), *params, limit],
+    ).using(queryset.db))
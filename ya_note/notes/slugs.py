@@ -0,0 +1,58 @@
+"""Транслитерация заголовков и подбор уникальных slug для заметок."""
+from functools import lru_cache
+
+from django.db.models import Q
+from pytils.translit import slugify as translit_slugify
+
+# Заголовки заметок часто повторяются, особенно при импорте, а
+# транслитерация в pytils заметно дороже поиска в словаре.
+SLUGIFY_CACHE_SIZE = 4096
+# Под суффикс вида -2, -3, ... резервируем место в конце slug.
+SUFFIX_RESERVE = 8
+DEFAULT_SLUG = 'note'
+
+
+@lru_cache(maxsize=SLUGIFY_CACHE_SIZE)
+def slugify(title):
+    """Транслитерирует заголовок в slug, запоминая результат."""
+    return translit_slugify(title)
+
+
+def slugify_many(titles):
+    """Транслитерирует пачку заголовков, каждый уникальный — один раз."""
+    slugs = {title: slugify(title) for title in set(titles)}
+    return [slugs[title] for title in titles]
+
+
+def with_suffix(base, number, max_length):
+    if number == 1:
+        return base[:max_length]
+    suffix = f'-{number}'
+    return base[:max_length - len(suffix)] + suffix
+
+
+def allocate_slug(queryset, base, max_length, exclude_pk=None):
+    """
+    Возвращает первый свободный slug из base, base-2, base-3, ...
+
+    Занятые варианты выбираются одним запросом: сам base и base-...,
+    а не все slug с коротким общим началом. Между проверкой и вставкой
+    slug может занять параллельный запрос, поэтому вызывающий код должен
+    повторить попытку при IntegrityError.
+    """
+    base = base[:max_length] or DEFAULT_SLUG
+    if len(base) + SUFFIX_RESERVE <= max_length:
+        candidates = Q(slug=base) | Q(slug__startswith=f'{base}-')
+    else:
+        # Длинный base обрезается под суффикс, поэтому ищем по началу,
+        # которое суффикс не затрагивает; оно не короче max_length - 8.
+        candidates = Q(slug__startswith=base[:max_length - SUFFIX_RESERVE])
+    taken = set(
+        queryset.filter(candidates)
+        .exclude(pk=exclude_pk)
+        .values_list('slug', flat=True)
+    )
+    number = 1
+    while with_suffix(base, number, max_length) in taken:
+        number += 1
+    return with_suffix(base, number, max_length)
@@ -0,0 +1,36 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+QUERY_BUDGET_SIZES = (1, 5, 25)
+
+
+class QueryBudgetMixin:
+    """Проверка бюджета запросов страницы для TestCase."""
+
+    query_budget_sizes = QUERY_BUDGET_SIZES
+
+    def assert_query_budget(self, make_request, prepare, budget):
+        """
+        Проверяет, что страница укладывается в budget запросов к базе.
+
+        Перед каждым замером prepare(size) добавляет size строк, которые
+        выводит страница. Число запросов не должно расти вместе с числом
+        строк: рост означает запрос на строку (N+1). Первый запрос
+        прогревает кеши процесса и в замеры не входит.
+        """
+        make_request()
+        counts = {}
+        for size in self.query_budget_sizes:
+            prepare(size)
+            with CaptureQueriesContext(connection) as context:
+                make_request()
+            counts[size] = len(context)
+        self.assertLessEqual(
+            max(counts.values()), budget,
+            f'Страница превысила бюджет в {budget} запросов: {counts}.'
+        )
+        sizes = self.query_budget_sizes
+        self.assertLessEqual(
+            counts[sizes[-1]], counts[sizes[0]],
+            f'Число запросов растёт вместе с числом строк: {counts}.'
+        )
@@ -1,12 +1,31 @@
+import csv
+import io
+import json
+import re
+import tempfile
+import zipfile
+from http import HTTPStatus
+from pathlib import Path
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from notes.models import Note
+from notes.search import search_notes
+from notes.tests.query_budget import QueryBudgetMixin
 
 
 User = get_user_model()
 
+# Запросы сессии и пользователя у авторизованного клиента.
+SESSION_QUERIES = 2
+QUERIES = re.compile(r'desc="(\d+) queries"')
+
 
 class TestContent(TestCase):
     """Тестирование контента страниц приложения для заметок."""
@@ -48,6 +67,70 @@ class TestContent(TestCase):
         self.assertEqual(len(object_list), 1)
         self.assertEqual(object_list[0], self.note)
 
+    def test_notes_list_is_paginated(self):
+        """Список заметок разбит на страницы."""
+        Note.objects.bulk_create(
+            Note(
+                title=f'Заметка {index}',
+                text='Текст',
+                slug=f'note-{index}',
+                author=self.author,
+            )
+            for index in range(settings.NOTES_COUNT_ON_PAGE)
+        )
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('notes:list'))
+        self.assertEqual(
+            len(response.context['object_list']), settings.NOTES_COUNT_ON_PAGE
+        )
+        response = self.client.get(reverse('notes:list'), {'page': 2})
+        self.assertEqual(len(response.context['object_list']), 1)
+
+    @override_settings(NOTES_COUNT_ON_PAGE=1)
+    def test_notes_list_page_size_read_per_request(self):
+        """Размер страницы списка берётся из настроек на каждый запрос."""
+        Note.objects.create(
+            title='Вторая заметка', text='Текст', slug='second',
+            author=self.author,
+        )
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('notes:list'))
+        self.assertEqual(len(response.context['object_list']), 1)
+
+    def test_notes_list_search_by_title(self):
+        """Поиск в списке оставляет заметки с подходящим заголовком."""
+        Note.objects.create(
+            title='Список покупок',
+            text='Молоко',
+            slug='shopping',
+            author=self.author
+        )
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('notes:list'), {'q': 'покупок'})
+        self.assertEqual(
+            [note.slug for note in response.context['object_list']],
+            ['shopping']
+        )
+
+    def test_notes_list_search_ignores_case(self):
+        """Регистр кириллицы в запросе и заголовке не важен."""
+        Note.objects.create(
+            title='Список покупок',
+            text='Молоко',
+            slug='shopping',
+            author=self.author
+        )
+        self.client.force_login(self.author)
+        for query in ('список', 'СПИСОК', 'сПиСоК Покупок'):
+            with self.subTest(query=query):
+                response = self.client.get(
+                    reverse('notes:list'), {'q': query}
+                )
+                self.assertEqual(
+                    [note.slug for note in response.context['object_list']],
+                    ['shopping']
+                )
+
     def test_create_page_contains_form(self):
         """На страницу создания заметки передаётся форма."""
         self.client.force_login(self.author)
@@ -73,3 +156,265 @@ class TestContent(TestCase):
         response = self.client.get(reverse('notes:home'))
         notes_url = reverse('notes:list')
         self.assertNotContains(response, notes_url)
+
+
+class TestSearch(TestCase):
+    """Тестирование полнотекстового поиска по заметкам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных."""
+        cls.author = User.objects.create(username='Автор заметки')
+        cls.reader = User.objects.create(username='Читатель')
+        cls.in_text = Note.objects.create(
+            title='Покупки',
+            text='Купить молоко и хлеб',
+            slug='shopping',
+            author=cls.author
+        )
+        cls.in_title = Note.objects.create(
+            title='Молоко',
+            text='Обезжиренное',
+            slug='milk',
+            author=cls.author
+        )
+        Note.objects.create(
+            title='Чужое молоко',
+            text='Молоко соседа',
+            slug='foreign-milk',
+            author=cls.reader
+        )
+        cls.url = reverse('notes:search')
+
+    def search(self, query):
+        self.client.force_login(self.author)
+        response = self.client.get(self.url, {'q': query})
+        return [note.slug for note in response.context['object_list']]
+
+    def test_search_ranks_title_matches_first(self):
+        """Совпадение в заголовке выше совпадения в тексте."""
+        self.assertEqual(self.search('молоко'), ['milk', 'shopping'])
+
+    def test_search_matches_word_prefix(self):
+        """Слово ищется по началу."""
+        self.assertEqual(self.search('хле'), ['shopping'])
+
+    def test_search_index_follows_changes(self):
+        """Индекс обновляется при изменении и удалении заметок."""
+        Note.objects.filter(pk=self.in_text.pk).update(text='Купить сыр')
+        self.in_title.delete()
+        self.assertEqual(self.search('молоко'), [])
+        self.assertEqual(self.search('сыр'), ['shopping'])
+
+    def test_search_scoped_to_author_in_index(self):
+        """Автор отсекается самим MATCH, а не только фильтром выборки."""
+        found = search_notes(
+            Note.objects.all(), 'молоко', author_id=self.author.pk
+        )
+        self.assertEqual([note.slug for note in found], ['milk', 'shopping'])
+
+    def test_search_without_fts_index(self):
+        """Без индекса FTS5 работает поиск подстроки."""
+        with patch('notes.search.fts_available', return_value=False):
+            self.assertEqual(self.search('хлеб'), ['shopping'])
+
+
+class TestExport(TestCase):
+    """Тестирование выгрузки заметок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных."""
+        cls.author = User.objects.create(username='Автор заметки')
+        cls.reader = User.objects.create(username='Читатель')
+        cls.notes = Note.objects.bulk_create(
+            Note(
+                title=f'Заметка {index}',
+                text=f'Текст, "с кавычками" {index}',
+                slug=f'note-{index}',
+                author=cls.author,
+            )
+            for index in range(3)
+        )
+        Note.objects.create(
+            title='Чужая', text='Текст', slug='foreign', author=cls.reader
+        )
+        cls.url = reverse('notes:export')
+
+    def export(self, export_format):
+        self.client.force_login(self.author)
+        response = self.client.get(self.url, {'format': export_format})
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_export_ndjson(self):
+        """NDJSON: по строке на каждую заметку автора."""
+        rows = [
+            json.loads(line)
+            for line in self.export('ndjson').decode().splitlines()
+        ]
+        self.assertEqual(
+            [row['slug'] for row in rows],
+            [note.slug for note in self.notes]
+        )
+
+    def test_export_csv(self):
+        """CSV с заголовком и экранированием кавычек."""
+        rows = list(csv.DictReader(io.StringIO(self.export('csv').decode())))
+        self.assertEqual(len(rows), len(self.notes))
+        self.assertEqual(rows[0]['text'], self.notes[0].text)
+
+    def test_export_zip(self):
+        """ZIP с Markdown-файлом на заметку."""
+        with zipfile.ZipFile(io.BytesIO(self.export('zip'))) as archive:
+            self.assertEqual(
+                archive.namelist(),
+                [f'{note.slug}.md' for note in self.notes]
+            )
+            self.assertEqual(
+                archive.read('note-0.md').decode(),
+                f'# {self.notes[0].title}\n\n{self.notes[0].text}\n'
+            )
+
+    def test_export_unknown_format(self):
+        """Неизвестный формат — 404."""
+        self.client.force_login(self.author)
+        response = self.client.get(self.url, {'format': 'xls'})
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_export_notes_command(self):
+        """Команда export_notes пишет выгрузку в файл."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'notes.ndjson'
+            call_command(
+                'export_notes', self.author.username, output=str(path)
+            )
+            lines = path.read_text(encoding='utf-8').splitlines()
+        self.assertEqual(len(lines), len(self.notes))
+
+
+@override_settings(NOTES_INSTRUMENTATION_SAMPLE_RATE=1)
+class TestInstrumentation(TestCase):
+    """Тестирование замеров запросов к страницам заметок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.url = reverse('notes:list')
+
+    def test_server_timing(self):
+        """Замеренный ответ несёт Server-Timing и попадает в агрегаты."""
+        self.client.force_login(self.author)
+        response = self.client.get(self.url)
+        timing = response.headers['Server-Timing']
+        for metric in ('db;dur=', 'dup;desc=', 'render;dur=', 'total;dur='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, timing)
+        output = io.StringIO()
+        call_command('request_metrics', stdout=output)
+        self.assertIn('notes:list', output.getvalue())
+
+    def test_server_timing_under_asgi(self):
+        """Под ASGI замер видит те же запросы к базе, что и под WSGI."""
+        self.client.force_login(self.author)
+        self.async_client.force_login(self.author)
+        expected = self.client.get(self.url).headers['Server-Timing']
+        response = async_to_sync(self.async_client.get)(self.url)
+        queries = QUERIES.search(response.headers['Server-Timing'])
+        self.assertEqual(queries[1], QUERIES.search(expected)[1])
+        self.assertGreater(int(queries[1]), 0)
+
+    @override_settings(NOTES_INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        response = self.client.get(reverse('notes:home'))
+        self.assertNotIn('Server-Timing', response.headers)
+
+
+class TestQueryBudget(QueryBudgetMixin, TestCase):
+    """Число запросов страниц не зависит от числа заметок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор заметки')
+        cls.note = Note.objects.create(
+            title='Список покупок', text='Хлеб', slug='note', author=cls.author
+        )
+        cls.created = 0
+
+    def setUp(self):
+        self.client.force_login(self.author)
+
+    def add_notes(self, size):
+        Note.objects.bulk_create(
+            Note(
+                title=f'Список покупок {self.created + index}',
+                text='Хлеб и молоко',
+                slug=f'note-{self.created + index}',
+                author=self.author,
+            )
+            for index in range(size)
+        )
+        self.created += size
+
+    def get(self, url, data=None):
+        response = self.client.get(url, data)
+        if response.streaming:
+            b''.join(response.streaming_content)
+
+    def test_get_pages(self):
+        slug = (self.note.slug,)
+        cases = (
+            ('notes:home', None, None, SESSION_QUERIES),
+            ('notes:list', None, None, SESSION_QUERIES + 2),
+            ('notes:list', None, {'q': 'покупок'}, SESSION_QUERIES + 2),
+            ('notes:list', None, {'page': 2}, SESSION_QUERIES + 2),
+            ('notes:search', None, {'q': 'хлеб'}, SESSION_QUERIES + 1),
+            ('notes:detail', slug, None, SESSION_QUERIES + 1),
+            ('notes:add', None, None, SESSION_QUERIES),
+            ('notes:edit', slug, None, SESSION_QUERIES + 1),
+            ('notes:delete', slug, None, SESSION_QUERIES + 1),
+            ('notes:success', None, None, SESSION_QUERIES),
+            ('notes:export', None, {'format': 'ndjson'}, SESSION_QUERIES + 1),
+            ('notes:export', None, {'format': 'zip'}, SESSION_QUERIES + 1),
+        )
+        for name, args, data, budget in cases:
+            with self.subTest(name=name, data=data):
+                url = reverse(name, args=args)
+                self.assert_query_budget(
+                    lambda: self.get(url, data), self.add_notes, budget
+                )
+
+    def test_add_note(self):
+        self.assert_query_budget(
+            lambda: self.client.post(
+                reverse('notes:add'),
+                {'title': f'Новая {self.created}', 'text': 'Текст'},
+            ),
+            self.add_notes,
+            SESSION_QUERIES + 6,
+        )
+
+    def test_edit_note(self):
+        url = reverse('notes:edit', args=(self.note.slug,))
+        self.assert_query_budget(
+            lambda: self.client.post(
+                url, {'title': 'Правка', 'text': 'Текст', 'slug': 'note'}
+            ),
+            self.add_notes,
+            SESSION_QUERIES + 4,
+        )
+
+    def test_delete_note(self):
+        slugs = ['note']
+
+        def prepare(size):
+            self.add_notes(size)
+            slugs.append(f'note-{self.created - 1}')
+
+        self.assert_query_budget(
+            lambda: self.client.post(
+                reverse('notes:delete', args=(slugs.pop(),))
+            ),
+            prepare,
+            SESSION_QUERIES + 2,
+        )
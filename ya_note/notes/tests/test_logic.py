@@ -1,10 +1,18 @@
 from http import HTTPStatus
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from pytils.translit import slugify
 
+from notes import ratelimit
 from notes.models import Note
+from notes.slugs import allocate_slug, slugify_many
 
 
 User = get_user_model()
@@ -137,3 +145,96 @@ class TestNoteEditDelete(TestCase):
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         notes_count_after = Note.objects.count()
         self.assertEqual(notes_count_after, notes_count_before)
+
+
+class TestSlugAllocation(TestCase):
+    """Тестирование подбора уникального slug."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание тестовых данных."""
+        cls.author = User.objects.create(username='Автор')
+        cls.title = 'Одинаковый заголовок'
+
+    def test_duplicate_titles_get_numbered_slugs(self):
+        """Заметки с одинаковым заголовком получают суффиксы -2, -3."""
+        slugs = [
+            Note.objects.create(
+                title=self.title, text='Текст', author=self.author
+            ).slug
+            for _ in range(3)
+        ]
+        base = slugify(self.title)
+        self.assertEqual(slugs, [base, f'{base}-2', f'{base}-3'])
+
+    def test_suffix_fits_max_length(self):
+        """Суффикс не выводит slug за пределы длины поля."""
+        Note.objects.create(slug='a' * 100, text='Текст', author=self.author)
+        slug = allocate_slug(Note.objects.all(), 'a' * 120, 100)
+        self.assertEqual(slug, 'a' * 98 + '-2')
+
+    def test_allocate_slug_ignores_longer_slugs(self):
+        """Slug, лишь начинающиеся с base, не загружаются и не мешают."""
+        for slug in ('note', 'note-2', 'notebook', 'notes-list'):
+            Note.objects.create(slug=slug, text='Текст', author=self.author)
+        with CaptureQueriesContext(connection) as queries:
+            slug = allocate_slug(Note.objects.all(), 'note', 100)
+        self.assertEqual(slug, 'note-3')
+        self.assertNotIn("LIKE 'note%'", queries[0]['sql'])
+
+    def test_retry_when_slug_taken_concurrently(self):
+        """Если slug заняли между подбором и вставкой, берётся следующий."""
+        base = slugify(self.title)
+        Note.objects.create(slug=base, text='Текст', author=self.author)
+        with patch('notes.models.allocate_slug', side_effect=[base, 'free']):
+            note = Note.objects.create(
+                title=self.title, text='Текст', author=self.author
+            )
+        self.assertEqual(note.slug, 'free')
+
+    def test_slugify_many_matches_pytils(self):
+        """Пакетная транслитерация совпадает с pytils и сохраняет порядок."""
+        titles = [self.title, 'Другой заголовок', self.title]
+        self.assertEqual(
+            slugify_many(titles), [slugify(title) for title in titles]
+        )
+
+
+@override_settings(NOTES_RATELIMITS={'note': '2/m'})
+class TestNoteRateLimit(TestCase):
+    """Тестирование ограничения частоты создания заметок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.add_url = reverse('notes:add')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.author)
+
+    def test_too_many_notes(self):
+        """Сверх лимита заметка не создаётся, ответ — 429."""
+        for index in range(2):
+            self.client.post(
+                self.add_url, data={'title': f'Заметка {index}', 'text': '.'}
+            )
+        response = self.client.post(
+            self.add_url, data={'title': 'Лишняя', 'text': '.'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertGreater(int(response.headers['Retry-After']), 0)
+        self.assertEqual(Note.objects.count(), 2)
+
+    def test_zero_limit_rejected(self):
+        """Частота без единого разрешённого запроса — ошибка настройки."""
+        for rate in ('0/m', '-1/h'):
+            with self.subTest(rate=rate):
+                with self.assertRaises(ImproperlyConfigured):
+                    ratelimit.hit('test', 'ident', rate)
+
+    def test_get_is_not_limited(self):
+        """Открытие формы не расходует лимит."""
+        for _ in range(3):
+            response = self.client.get(self.add_url)
+            self.assertEqual(response.status_code, HTTPStatus.OK)
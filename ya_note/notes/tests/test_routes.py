@@ -39,6 +39,8 @@ class TestRoutes(BaseTestNote):
         self.client.force_login(self.reader)
         urls = (
             ('notes:list', None),
+            ('notes:search', None),
+            ('notes:export', None),
             ('notes:success', None),
             ('notes:add', None),
         )
@@ -84,6 +86,8 @@ class TestRoutes(BaseTestNote):
         login_url = reverse('users:login')
         protected_urls = (
             ('notes:list', None),
+            ('notes:search', None),
+            ('notes:export', None),
             ('notes:success', None),
             ('notes:add', None),
             ('notes:detail', (self.note.slug,)),
@@ -1,9 +1,15 @@
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import IntegrityError, transaction
+from django.http import Http404, HttpResponseRedirect, StreamingHttpResponse
 from django.urls import reverse_lazy
 from django.views import generic
 
+from .export import FORMATS
 from .forms import NoteForm
 from .models import Note
+from .ratelimit import RateLimitMixin
+from .search import filter_by_title, search_notes
 
 
 class Home(generic.TemplateView):
@@ -26,22 +32,35 @@ class NoteBase(LoginRequiredMixin):
         return self.model.objects.filter(author=self.request.user)
 
 
-class NoteCreate(NoteBase, generic.CreateView):
-    """Добавление заметки."""
+class NoteFormMixin:
+    """Сохранение формы заметки с проверкой slug уникальным индексом."""
     template_name = 'notes/form.html'
     form_class = NoteForm
 
     def form_valid(self, form):
-        new_note = form.save(commit=False)
-        new_note.author = self.request.user
-        new_note.save()
+        try:
+            with transaction.atomic():
+                self.object = form.save()
+        except IntegrityError:
+            form.add_slug_error()
+            return self.form_invalid(form)
+        return HttpResponseRedirect(self.get_success_url())
+
+
+class NoteCreate(
+        NoteBase, RateLimitMixin, NoteFormMixin, generic.CreateView
+):
+    """Добавление заметки."""
+    ratelimit_scope = 'note'
+    ratelimit_rate = '30/m'
+
+    def form_valid(self, form):
+        form.instance.author = self.request.user
         return super().form_valid(form)
 
 
-class NoteUpdate(NoteBase, generic.UpdateView):
+class NoteUpdate(NoteBase, NoteFormMixin, generic.UpdateView):
     """Редактирование заметки."""
-    template_name = 'notes/form.html'
-    form_class = NoteForm
 
 
 class NoteDelete(NoteBase, generic.DeleteView):
@@ -50,9 +69,54 @@ class NoteDelete(NoteBase, generic.DeleteView):
 
 
 class NotesList(NoteBase, generic.ListView):
-    """Список всех заметок пользователя."""
+    """Список заметок пользователя по страницам, с поиском по заголовку."""
     template_name = 'notes/list.html'
 
+    def get_paginate_by(self, queryset):
+        """Настройка читается на запрос, чтобы её можно было переопределить."""
+        return settings.NOTES_COUNT_ON_PAGE
+
+    def get_queryset(self):
+        """Шаблону списка хватает идентификатора, slug и заголовка."""
+        queryset = super().get_queryset().only(
+            'id', 'slug', 'title'
+        ).order_by('id')
+        query = self.request.GET.get('q')
+        if query:
+            queryset = filter_by_title(
+                queryset, query, author_id=self.request.user.pk
+            )
+        return queryset
+
+
+class NoteSearch(NoteBase, generic.ListView):
+    """Полнотекстовый поиск по заметкам пользователя."""
+    template_name = 'notes/search.html'
+
+    def get_queryset(self):
+        return search_notes(
+            super().get_queryset(),
+            self.request.GET.get('q', ''),
+            author_id=self.request.user.pk,
+        )
+
+
+class NoteExport(NoteBase, generic.View):
+    """Выгрузка всех заметок пользователя одним файлом."""
+
+    def get(self, request, *args, **kwargs):
+        export_format = FORMATS.get(request.GET.get('format', 'ndjson'))
+        if export_format is None:
+            raise Http404('Неизвестный формат выгрузки.')
+        response = StreamingHttpResponse(
+            export_format.render(self.get_queryset()),
+            content_type=export_format.content_type,
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="notes.{export_format.extension}"'
+        )
+        return response
+
 
 class NoteDetail(NoteBase, generic.DetailView):
     """Заметка подробно."""
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -23,6 +24,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'notes.instrumentation.InstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -55,10 +57,61 @@ WSGI_APPLICATION = 'yanote.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.getenv('DJANGO_SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
     }
 }
 
+# Прагмы SQLite, которые выставляются каждому новому соединению.
+SQLITE_PRAGMAS = {}
+
+# production: постоянные соединения с проверкой перед запросом. Если задан
+# POSTGRES_DB — PostgreSQL с пулом соединений (нужен psycopg[pool]), иначе
+# SQLite в режиме WAL: читатели не ждут писателя, а писатели ждут друг
+# друга busy_timeout, а не падают с «database is locked».
+DATABASE_PROFILE = os.getenv('DJANGO_DB_PROFILE', 'development')
+
+if DATABASE_PROFILE == 'production' and os.getenv('POSTGRES_DB'):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.getenv('POSTGRES_DB'),
+        'USER': os.getenv('POSTGRES_USER', 'postgres'),
+        'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+        'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
+        'PORT': os.getenv('POSTGRES_PORT', '5432'),
+        # Соединения держит пул, постоянные соединения Django с ним
+        # несовместимы.
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pool': {
+                'min_size': 2,
+                'max_size': int(os.getenv('POSTGRES_POOL_SIZE', 10)),
+            },
+        },
+    }
+elif DATABASE_PROFILE == 'production':
+    DATABASES['default'].update(
+        CONN_MAX_AGE=int(os.getenv('DJANGO_CONN_MAX_AGE', 600)),
+        CONN_HEALTH_CHECKS=True,
+        OPTIONS={'transaction_mode': 'IMMEDIATE', 'timeout': 20},
+    )
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 20000,
+    }
+
+# Файл тестовой базы SQLite. По умолчанию тесты идут в памяти; run_tests.sh
+# в параллельном режиме задаёт путь с хешем миграций, и pytest --reuse-db
+# переиспользует базу, пока миграции не менялись.
+if (
+    os.getenv('DJANGO_TEST_SQLITE_PATH')
+    and DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3'
+):
+    DATABASES['default']['TEST'] = {
+        'NAME': os.getenv('DJANGO_TEST_SQLITE_PATH'),
+    }
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -87,3 +140,20 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
+
+NOTES_COUNT_ON_PAGE = 20
+NOTES_SEARCH_LIMIT = 50
+NOTES_EXPORT_CHUNK_SIZE = 2000
+
+# Доля запросов к notes, для которых считаются запросы к базе и время
+# ответа (заголовок Server-Timing, лог notes.instrumentation, агрегаты
+# в кеше — см. manage.py request_metrics).
+NOTES_INSTRUMENTATION_SAMPLE_RATE = float(
+    os.getenv('NOTES_INSTRUMENTATION_SAMPLE_RATE', 0.05)
+)
+
+# Частота записи по областям представлений: «запросов/период», период —
+# s, m, h или d с необязательным множителем («100/5m»); None снимает лимит.
+# NOTES_RATELIMIT_ENABLED=0 отключает ограничение целиком.
+NOTES_RATELIMIT_ENABLED = os.getenv('NOTES_RATELIMIT_ENABLED', '1') == '1'
+NOTES_RATELIMITS = {}